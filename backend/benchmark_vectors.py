@@ -0,0 +1,107 @@
+import os
+import sys
+import time
+import random
+import argparse
+from qdrant_client import QdrantClient, models
+from dotenv import load_dotenv
+
+from src.storage.vector_config import collection_settings, search_params, truncate_vector, QDRANT_HNSW_M
+
+load_dotenv()
+
+# (name, dims, quantization, originals on disk)
+SETTINGS = [
+    ("float32-ram", 3072, "none", False),
+    ("scalar-int8", 3072, "scalar", True),
+    ("binary", 3072, "binary", True),
+    ("float32-1536", 1536, "none", False),
+    ("scalar-768", 768, "scalar", True),
+]
+
+def estimate_ram_bytes(count: int, dim: int, quantization: str, on_disk: bool) -> int:
+    # Rough resident estimate: originals (unless on disk) + quantized copy + HNSW links
+    originals = 0 if on_disk else count * dim * 4
+    if quantization == "scalar":
+        quantized = count * dim
+    elif quantization == "binary":
+        quantized = count * dim // 8
+    else:
+        quantized = 0
+    graph = count * QDRANT_HNSW_M * 2 * 4
+    return originals + quantized + graph
+
+def fetch_points(client: QdrantClient, collection: str, limit: int):
+    points, offset = [], None
+    while len(points) < limit:
+        batch, offset = client.scroll(collection, limit=min(256, limit - len(points)), offset=offset, with_vectors=True, with_payload=False)
+        points.extend(batch)
+        if offset is None:
+            break
+    return points
+
+def wait_until_indexed(client: QdrantClient, collection: str, timeout: float = 600):
+    started = time.time()
+    while time.time() - started < timeout:
+        if client.get_collection(collection).status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(1)
+    print(f"WARNING: {collection} still optimizing after {timeout}s")
+
+def top_ids(client: QdrantClient, collection: str, vector, k: int, params: models.SearchParams, exclude):
+    hits = client.query_points(collection, query=vector, limit=k + 1, search_params=params, with_payload=False).points
+    return [hit.id for hit in hits if hit.id != exclude][:k]
+
+def run_benchmark(source: str, sample: int, queries: int, k: int):
+    client = QdrantClient(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"), timeout=120)
+    if not client.collection_exists(source):
+        print(f"Collection {source} not found")
+        sys.exit(1)
+
+    print(f"Loading up to {sample} points from {source}...")
+    points = fetch_points(client, source, sample)
+    if not points:
+        print("No points to benchmark")
+        return
+    query_points = random.sample(points, min(queries, len(points)))
+
+    # Ground truth: exact (brute force) search over the full float32 vectors
+    exact = models.SearchParams(exact=True, quantization=models.QuantizationSearchParams(ignore=True))
+    truth = {p.id: top_ids(client, source, p.vector, k, exact, p.id) for p in query_points}
+
+    print(f"\n{'setting':<14} {'dims':>5} {'est. RAM MB':>12} {'recall@' + str(k):>9} {'avg ms':>8}")
+    for name, dim, quantization, on_disk in SETTINGS:
+        collection = f"bench_{source}_{name}"
+        if client.collection_exists(collection):
+            client.delete_collection(collection)
+        client.create_collection(collection, **collection_settings(dim, quantization, on_disk))
+        try:
+            for i in range(0, len(points), 256):
+                client.upsert(collection, points=[
+                    models.PointStruct(id=p.id, vector=truncate_vector(p.vector, dim))
+                    for p in points[i : i + 256]
+                ])
+            wait_until_indexed(client, collection)
+
+            params = search_params(quantization)
+            hits, elapsed = 0, 0.0
+            for p in query_points:
+                started = time.perf_counter()
+                found = top_ids(client, collection, truncate_vector(p.vector, dim), k, params, p.id)
+                elapsed += time.perf_counter() - started
+                hits += len(set(found) & set(truth[p.id]))
+
+            expected = sum(len(ids) for ids in truth.values()) or 1
+            ram_mb = estimate_ram_bytes(len(points), dim, quantization, on_disk) / (1024 * 1024)
+            print(f"{name:<14} {dim:>5} {ram_mb:>12.1f} {hits / expected:>9.3f} {1000 * elapsed / len(query_points):>8.1f}")
+        finally:
+            client.delete_collection(collection)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory vs recall benchmark for Qdrant storage settings")
+    parser.add_argument("--collection", default="ALL_DOCS")
+    parser.add_argument("--sample", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+    run_benchmark(args.collection, args.sample, args.queries, args.k)
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException
+import asyncio
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import Optional, List
 from datetime import datetime
 from ..storage.db import storage
 from ..workers.manager import job_manager
-from ..workers.tasks import generate_single_answer_task, generate_answers_for_project
+from ..workers.tasks import save_single_answer, format_api_error
+from ..services.generation import generation_service
+from ..storage.corpus import get_corpus_version
+from ..services.scheduler import interactive_call
+from .sse import sse_event
+from ..utils.ids import is_legacy_id
 from ..models.models import RequestStatusType, JobStatus, AnswerStatus
 from pydantic import BaseModel
 
@@ -25,7 +32,7 @@ class UpdateAnswerPayload(BaseModel):
     status: Optional[str] = None
 
 @router.post("/generate-single-answer")
-async def generate_single_answer(background_tasks: BackgroundTasks, payload: GenerateAnswerPayload):
+async def generate_single_answer(payload: GenerateAnswerPayload):
     project_id = payload.project_id
     question_id = payload.question_id
     
@@ -41,19 +48,66 @@ async def generate_single_answer(background_tasks: BackgroundTasks, payload: Gen
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
         
-    job_id = await job_manager.create_job(RequestStatusType.ANSWER_GENERATION, message="Generating single answer...")
-    background_tasks.add_task(
-        generate_single_answer_task, 
-        job_id, 
-        project_id, 
-        question_id, 
-        question["text"], 
-        project.get("document_scope", "ALL_DOCS")
+    job_id = await job_manager.enqueue(RequestStatusType.ANSWER_GENERATION, "generate_single_answer", {
+        "project_id": project_id,
+        "question_id": question_id,
+        "question_text": question["text"],
+        "scope": project.get("document_scope", "ALL_DOCS")
+    }, message="Generating single answer...")
+    return {"job_id": job_id, "status": JobStatus.PENDING}
+
+@router.get("/generate-single-answer/stream")
+async def generate_single_answer_stream(project_id: str, question_id: str):
+    db = storage.get_db()
+    project = await db.projects.find_one({"id": project_id})
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    question = await db.questions.find_one({"id": question_id, "project_id": project_id})
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
+
+    scope = project.get("document_scope", "ALL_DOCS")
+    job_id = await job_manager.create_job(RequestStatusType.ANSWER_GENERATION, message="Streaming single answer...")
+
+    async def event_stream():
+        interactive_call.set(True)
+        finished = False
+        try:
+            yield sse_event("job", {"job_id": job_id})
+            corpus_version = await get_corpus_version()
+            answer = None
+            async for event, data in generation_service.stream_answer(project_id, question_id, question["text"], scope):
+                if event == "answer":
+                    answer = data
+                else:
+                    yield sse_event(event, data)
+
+            # Persisted exactly like generate_single_answer_task
+            await save_single_answer(answer, question["text"], scope, corpus_version)
+            await job_manager.update_job(job_id, status=JobStatus.COMPLETED, message="Answer generated.", result={"question_id": question_id})
+            finished = True
+            yield sse_event("done", answer.dict())
+        except Exception as e:
+            await job_manager.update_job(job_id, status=JobStatus.FAILED, error=str(e))
+            finished = True
+            yield sse_event("error", {"detail": format_api_error(e)})
+        finally:
+            if not finished:
+                # Client went away mid-stream: this job has no lease, so nothing would ever requeue or close it
+                try:
+                    await asyncio.shield(job_manager.update_job(job_id, status=JobStatus.CANCELLED, message="Stream closed before the answer was saved."))
+                finally:
+                    job_manager.forget(job_id)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-    return {"job_id": job_id, "status": JobStatus.RUNNING}
 
 @router.post("/generate-all-answers")
-async def generate_all_answers(background_tasks: BackgroundTasks, payload: GenerateAllPayload):
+async def generate_all_answers(payload: GenerateAllPayload):
     project_id = payload.project_id
     if not project_id:
         raise HTTPException(status_code=400, detail="project_id is required")
@@ -63,9 +117,8 @@ async def generate_all_answers(background_tasks: BackgroundTasks, payload: Gener
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
         
-    job_id = await job_manager.create_job(RequestStatusType.ANSWER_GENERATION, message="Generating all missing answers...")
-    background_tasks.add_task(generate_answers_for_project, job_id, project_id)
-    return {"job_id": job_id, "status": JobStatus.RUNNING}
+    job_id = await job_manager.enqueue(RequestStatusType.ANSWER_GENERATION, "generate_answers", {"project_id": project_id}, message="Generating all missing answers...")
+    return {"job_id": job_id, "status": JobStatus.PENDING}
 
 @router.post("/update-answer")
 async def update_answer(payload: UpdateAnswerPayload):
@@ -76,7 +129,16 @@ async def update_answer(payload: UpdateAnswerPayload):
     
     db = storage.get_db()
     
-    if answer_id:
+    if answer_id and is_legacy_id(answer_id):
+        # Legacy timestamp IDs aren't unique: narrow by project/question when given
+        query = {"id": answer_id}
+        if project_id: query["project_id"] = project_id
+        if question_id: query["question_id"] = question_id
+        matches = await db.answers.find(query).to_list(2)
+        if len(matches) > 1:
+            raise HTTPException(status_code=409, detail="Legacy answer_id matches several answers; pass project_id and question_id")
+        answer = matches[0] if matches else None
+    elif answer_id:
         answer = await db.answers.find_one({"id": answer_id})
     elif project_id and question_id:
         answer = await db.answers.find_one({"project_id": project_id, "question_id": question_id})
@@ -1,22 +1,65 @@
 import os, glob
-from fastapi import APIRouter, BackgroundTasks, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, conint
 from ..workers.manager import job_manager
-from ..workers.tasks import index_document_async_task
+from ..workers.tasks import INDEX_BULK_CONCURRENCY, INDEX_BULK_MAX_CONCURRENCY
 from ..models.models import RequestStatusType, JobStatus
 
 router = APIRouter(tags=["indexing"])
 
+class BulkIndexPayload(BaseModel):
+    directory: Optional[str] = None
+    file_paths: Optional[List[str]] = None
+    concurrency: Optional[conint(ge=1, le=INDEX_BULK_MAX_CONCURRENCY)] = None
+
+def default_doc_name(file_path: str) -> str:
+    return os.path.splitext(os.path.basename(file_path))[0]
+
 @router.post("/index-document-async")
-async def index_document_async(background_tasks: BackgroundTasks, payload: dict):
+async def index_document_async(payload: dict):
     file_path = payload.get("file_path")
     doc_name = payload.get("doc_name")
     if not file_path or not os.path.exists(file_path):
         raise HTTPException(status_code=400, detail="Valid file_path is required")
+    # Same default as /index-directory-async; the name keys the document's point IDs and manifest
+    doc_name = doc_name or default_doc_name(file_path)
 
-    job_id = await job_manager.create_job(RequestStatusType.INDEXING)
-    background_tasks.add_task(index_document_async_task, job_id, file_path, doc_name)
+    job_id = await job_manager.enqueue(RequestStatusType.INDEXING, "index_document", {"file_path": file_path, "doc_name": doc_name})
     return {"job_id": job_id, "status": JobStatus.PENDING}
 
+@router.post("/index-directory-async")
+async def index_directory_async(payload: BulkIndexPayload):
+    if payload.directory:
+        if not os.path.isdir(payload.directory):
+            raise HTTPException(status_code=400, detail="directory does not exist")
+        file_paths = sorted(glob.glob(os.path.join(payload.directory, "*.pdf")))
+    elif payload.file_paths:
+        missing = [f for f in payload.file_paths if not os.path.exists(f)]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Files not found: {missing}")
+        file_paths = payload.file_paths
+    else:
+        raise HTTPException(status_code=400, detail="directory or file_paths is required")
+
+    if not file_paths:
+        raise HTTPException(status_code=400, detail="No PDF files to index")
+
+    # Document names default to the file name without extension
+    files = [[f, default_doc_name(f)] for f in file_paths]
+    # Files indexed under one name would overwrite each other's points and chunk manifest
+    names = [doc_name for _, doc_name in files]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise HTTPException(status_code=400, detail=f"Several files map to the same document name: {duplicates}")
+    job_id = await job_manager.enqueue(
+        RequestStatusType.INDEXING,
+        "index_documents_bulk",
+        {"files": files, "concurrency": payload.concurrency if payload.concurrency is not None else INDEX_BULK_CONCURRENCY},
+        message=f"Queued {len(files)} files for indexing..."
+    )
+    return {"job_id": job_id, "status": JobStatus.PENDING, "file_count": len(files)}
+
 @router.get("/documents")
 async def list_documents():
     from ..storage.db import storage
@@ -1,8 +1,20 @@
-from fastapi import APIRouter, HTTPException
-from ..workers.manager import job_manager
+import os
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from ..workers.manager import job_manager, FINISHED_JOB_STATUSES, CANCELLABLE_TASKS
+from ..workers.events import job_events
+from ..models.models import JobStatus
+from .sse import sse_event
 
 router = APIRouter(tags=["jobs"])
 
+# Idle streams re-read job state from Mongo this often (updates from other processes don't
+# reach the local event backend), then send a comment line so proxies don't close them
+JOB_STREAM_KEEPALIVE_SECONDS = float(os.getenv("JOB_STREAM_KEEPALIVE_SECONDS", 15))
+
 @router.get("/get-request-status/{job_id}")
 async def get_request_status(job_id: str):
     job = await job_manager.get_job(job_id)
@@ -11,7 +23,89 @@ async def get_request_status(job_id: str):
     return job
 @router.get("/jobs/active")
 async def list_active_jobs():
-    from ..storage.db import storage
-    db = storage.get_db()
-    jobs = await db.jobs.find({"status": {"$in": ["RUNNING", "PENDING"]}}, {"_id": 0}).sort("created_at", -1).to_list(50)
-    return jobs
+    return await job_manager.list_jobs()
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    job = await job_manager.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.get("status") == JobStatus.RUNNING and job.get("task") not in CANCELLABLE_TASKS:
+        # Indexing and single answers have no checkpoint to stop at
+        raise HTTPException(status_code=409, detail="This job can't be cancelled once it has started")
+    status = await job_manager.cancel(job_id)
+    if status is None:
+        raise HTTPException(status_code=409, detail="Job has already finished")
+    # Running jobs stop at their next checkpoint (between questions for generation)
+    return {"job_id": job_id, "status": status, "cancel_requested": status != JobStatus.CANCELLED}
+
+def job_event(job: dict) -> str:
+    updated_at = job.get("updated_at")
+    event_id = updated_at.isoformat() if isinstance(updated_at, datetime) else None
+    return sse_event("job", job, event_id)
+
+@router.get("/jobs/stream")
+async def stream_jobs(request: Request, job_id: Optional[str] = None, last_event_id: Optional[str] = None):
+    """Server-sent job updates for one job (closed once it finishes) or for all active jobs.
+
+    Each event carries the job state; a reconnecting client sends Last-Event-ID and first
+    receives every job that changed since then.
+    """
+    since = None
+    resume = request.headers.get("last-event-id") or last_event_id
+    if resume:
+        try:
+            since = datetime.fromisoformat(resume)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+
+    if job_id and not await job_manager.get_job(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def poll(changed_since: Optional[datetime]) -> List[dict]:
+        # Also the fallback for updates made in other processes, which the local event backend never sees
+        if job_id:
+            job = await job_manager.get_job(job_id)
+            return [job] if job else []
+        return await job_manager.list_jobs(since=changed_since)
+
+    async def event_stream():
+        sent = {}  # job_id -> updated_at of the last state sent
+        last_poll = datetime.utcnow()
+
+        def changed(job: dict) -> bool:
+            if job.get("updated_at") is not None and sent.get(job["job_id"]) == job["updated_at"]:
+                return False
+            sent[job["job_id"]] = job.get("updated_at")
+            return True
+
+        async with job_events.subscribe() as queue:
+            # Snapshot after subscribing, so no update falls between the two
+            for job in await poll(since):
+                changed(job)
+                yield job_event(job)
+                if job_id and job.get("status") in FINISHED_JOB_STATUSES:
+                    return
+
+            while True:
+                try:
+                    jobs = [await asyncio.wait_for(queue.get(), timeout=JOB_STREAM_KEEPALIVE_SECONDS)]
+                except asyncio.TimeoutError:
+                    polled_at, last_poll = last_poll, datetime.utcnow()
+                    jobs = [job for job in await poll(polled_at) if changed(job)]
+                    if not jobs:
+                        yield ": keepalive\n\n"
+                        continue
+                for job in jobs:
+                    if job_id and job.get("job_id") != job_id:
+                        continue
+                    changed(job)
+                    yield job_event(job)
+                    if job_id and job.get("status") in FINISHED_JOB_STATUSES:
+                        return
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,43 @@
+from fastapi import APIRouter
+from ..services.embeddings import embedding_service
+from ..services.embedding_batcher import query_batcher
+from ..services.retrieval_cache import retrieval_cache
+from ..services.generation import generation_service
+from ..services.scheduler import llm_scheduler, embedding_scheduler
+from ..utils.lazy import startup_report
+from ..workers.manager import job_manager
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics/embedding-cache")
+async def embedding_cache_metrics():
+    # Reading metrics shouldn't build the service
+    if not embedding_service.initialized:
+        return {"initialized": False}
+    return embedding_service.get_stats()
+
+@router.get("/metrics/embedding-batcher")
+async def embedding_batcher_metrics():
+    return query_batcher.get_stats()
+
+@router.get("/metrics/retrieval-cache")
+async def retrieval_cache_metrics():
+    return retrieval_cache.get_stats()
+
+@router.get("/metrics/generation")
+async def generation_metrics():
+    if not generation_service.initialized:
+        return {"initialized": False}
+    return generation_service.get_stats()
+
+@router.get("/metrics/scheduler")
+async def scheduler_metrics():
+    return {"llm": llm_scheduler.get_stats(), "embedding": embedding_scheduler.get_stats()}
+
+@router.get("/metrics/jobs")
+async def job_metrics():
+    return job_manager.get_stats()
+
+@router.get("/metrics/startup")
+async def startup_metrics():
+    return startup_report()
@@ -1,9 +1,9 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException
-from typing import Optional, List
+import asyncio
+from fastapi import APIRouter, HTTPException
+from typing import Optional, List, Union
 from datetime import datetime
 from ..storage.db import storage
 from ..workers.manager import job_manager
-from ..workers.tasks import create_project_async_task
 from ..models.models import RequestStatusType, JobStatus, ProjectStatus
 from pydantic import BaseModel
 from typing import Optional
@@ -13,40 +13,57 @@ router = APIRouter(tags=["projects"])
 class CreateProjectPayload(BaseModel):
     name: str
     questionnaire_path: str
-    scope: Optional[str] = "ALL_DOCS"
+    scope: Optional[Union[str, List[str]]] = "ALL_DOCS"
 
 class UpdateProjectPayload(BaseModel):
     project_id: str
     name: Optional[str] = None
-    scope: Optional[str] = None
+    scope: Optional[Union[str, List[str]]] = None
     trigger_regeneration: Optional[bool] = False
 
+def validate_scope(scope: Optional[Union[str, List[str]]]):
+    # An empty list would scope the project to no documents at all; ALL_DOCS must be explicit
+    if isinstance(scope, list) and not scope:
+        raise HTTPException(status_code=400, detail="scope must list at least one document, or be ALL_DOCS")
+
 @router.post("/create-project-async")
-async def create_project_async(background_tasks: BackgroundTasks, payload: CreateProjectPayload):
+async def create_project_async(payload: CreateProjectPayload):
     name = payload.name
     q_path = payload.questionnaire_path
     scope = payload.scope
     
     if not name or not q_path:
         raise HTTPException(status_code=400, detail="Name and questionnaire_path are required")
+    validate_scope(scope)
         
-    job_id = await job_manager.create_job(RequestStatusType.PROJECT_CREATION)
-    background_tasks.add_task(create_project_async_task, job_id, name, q_path, scope)
-    return {"job_id": job_id, "status": JobStatus.RUNNING}
+    job_id = await job_manager.enqueue(RequestStatusType.PROJECT_CREATION, "create_project", {"name": name, "questionnaire_path": q_path, "scope": scope})
+    return {"job_id": job_id, "status": JobStatus.PENDING}
 
 @router.post("/resume-project-generation/{project_id}")
-async def resume_project_generation(project_id: str, background_tasks: BackgroundTasks, force: bool = False):
+async def resume_project_generation(project_id: str, force: bool = False):
     db = storage.get_db()
     project = await db.projects.find_one({"id": project_id})
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # If project is outdated, we likely want to force regenerate
-    should_force = force or project.get("status") == ProjectStatus.OUTDATED
-    
-    job_id = await job_manager.create_job(RequestStatusType.PROJECT_CREATION, message="Starting answer regeneration..." if should_force else "Resuming generation...")
+    # Outdated projects are refreshed incrementally: only answers whose context changed are regenerated
+    refresh = not force and project.get("status") == ProjectStatus.OUTDATED
+
+    if force:
+        message = "Starting answer regeneration..."
+    elif refresh:
+        message = "Refreshing outdated answers..."
+    else:
+        message = "Resuming generation..."
     # Passing empty q_path because it's already in DB, create_project_async_task handles this via project_id
-    background_tasks.add_task(create_project_async_task, job_id, project["name"], "", project["document_scope"], project_id, should_force)
+    job_id = await job_manager.enqueue(RequestStatusType.PROJECT_CREATION, "create_project", {
+        "name": project["name"],
+        "questionnaire_path": "",
+        "scope": project["document_scope"],
+        "project_id": project_id,
+        "force_regenerate": force,
+        "refresh": refresh
+    }, message=message)
     return {"job_id": job_id, "status": JobStatus.PENDING}
 
 @router.get("/get-project-info/{project_id}")
@@ -102,7 +119,7 @@ async def get_project_status(project_id: str):
     return project
 
 @router.post("/update-project-async")
-async def update_project_async(background_tasks: BackgroundTasks, payload: UpdateProjectPayload):
+async def update_project_async(payload: UpdateProjectPayload):
     project_id = payload.project_id
     
     db = storage.get_db()
@@ -110,6 +127,7 @@ async def update_project_async(background_tasks: BackgroundTasks, payload: Updat
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
+    validate_scope(payload.scope)
     updates = {}
     if payload.name: updates["name"] = payload.name
     if payload.scope: updates["document_scope"] = payload.scope
@@ -123,8 +141,13 @@ async def update_project_async(background_tasks: BackgroundTasks, payload: Updat
             await db.projects.update_one({"id": project_id}, {"$set": {"status": ProjectStatus.OUTDATED}})
             # Trigger background task to regenerate if requested
             if payload.trigger_regeneration:
-                job_id = await job_manager.create_job(RequestStatusType.PROJECT_UPDATE, message="Updating project and regenerating answers...")
-                background_tasks.add_task(create_project_async_task, job_id, project["name"], "", payload.scope, project_id)
+                job_id = await job_manager.enqueue(RequestStatusType.PROJECT_UPDATE, "create_project", {
+                    "name": project["name"],
+                    "questionnaire_path": "",
+                    "scope": payload.scope,
+                    "project_id": project_id,
+                    "refresh": True
+                }, message="Updating project and regenerating answers...")
                 return {"job_id": job_id, "message": "Project updated and regeneration started"}
 
 from ..services.evaluation import evaluation_service
@@ -141,25 +164,26 @@ async def evaluate_project(project_id: str, ground_truth_data: dict):
         
     answers = await db.answers.find({"project_id": project_id}).to_list(1000)
     
-    total_score = 0
-    evaluated_count = 0
-    
-    for answer in answers:
-        q_id = answer["question_id"]
-        if q_id in ground_truth_data:
-            truth = ground_truth_data[q_id]
-            ai_text = answer.get("answer_text", "")
-            
-            score = await evaluation_service.evaluate_answer(ai_text, truth)
-            
-            # Update answer with evaluation score
-            await db.answers.update_one(
-                {"_id": answer["_id"]}, 
-                {"$set": {"evaluation_score": score, "ground_truth": truth}}
-            )
-            total_score += score
-            evaluated_count += 1
-            
+    to_evaluate = [answer for answer in answers if answer["question_id"] in ground_truth_data]
+
+    async def evaluate(answer):
+        truth = ground_truth_data[answer["question_id"]]
+        ai_text = answer.get("answer_text", "")
+
+        score = await evaluation_service.evaluate_answer(ai_text, truth)
+
+        # Update answer with evaluation score
+        await db.answers.update_one(
+            {"_id": answer["_id"]},
+            {"$set": {"evaluation_score": score, "ground_truth": truth}}
+        )
+        return score
+
+    # Evaluated concurrently so the embedding micro-batcher can group the requests
+    scores = await asyncio.gather(*[evaluate(answer) for answer in to_evaluate])
+    total_score = sum(scores)
+    evaluated_count = len(scores)
+
     avg_score = total_score / evaluated_count if evaluated_count > 0 else 0
     
     # Update project with average score
@@ -0,0 +1,7 @@
+import json
+from typing import Optional
+
+def sse_event(event: str, data, event_id: Optional[str] = None) -> str:
+    # An id lets EventSource send Last-Event-ID when it reconnects
+    prefix = f"id: {event_id}\n" if event_id else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
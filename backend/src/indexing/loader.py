@@ -0,0 +1,118 @@
+import os
+import asyncio
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, AsyncIterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+# PDF text extraction is CPU bound, so it runs in worker processes instead of the event loop.
+# `python -m src.workers.worker --processes N` sets this to cpu_count // N for each worker process.
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", os.cpu_count() or 1))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 16))
+# Page ranges parsed ahead of the consumer when streaming; bounds resident pages per job
+PDF_STREAM_WINDOW = int(os.getenv("PDF_STREAM_WINDOW", PDF_WORKERS))
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn, not fork: the parent runs an event loop plus motor and to_thread threads,
+        # and a forked child can inherit a lock held by one of them and deadlock
+        _executor = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def _count_pages(file_path: str) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(file_path).pages)
+
+def _load_page_range(file_path: str, start: int, end: int, chunk_size: Optional[int] = None, chunk_overlap: int = 0) -> List["Document"]:
+    # Runs in a worker process. Metadata mirrors PyPDFLoader so citations keep working.
+    # PDF and splitter libraries are imported here so only worker processes load them.
+    from pypdf import PdfReader
+    from langchain_core.documents import Document
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    reader = PdfReader(file_path)
+    total_pages = len(reader.pages)
+    try:
+        page_labels = reader.page_labels
+    except Exception:
+        page_labels = None
+
+    documents = []
+    for i in range(start, min(end, total_pages)):
+        documents.append(Document(
+            page_content=reader.pages[i].extract_text() or "",
+            metadata={
+                "source": file_path,
+                "total_pages": total_pages,
+                "page": i,
+                "page_label": page_labels[i] if page_labels else str(i + 1)
+            }
+        ))
+
+    if chunk_size:
+        # Pages are split individually, so start_index stays relative to its page
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            add_start_index=True
+        )
+        documents = splitter.split_documents(documents)
+    return documents
+
+async def load_pdf(file_path: str, chunk_size: Optional[int] = None, chunk_overlap: int = 0) -> List["Document"]:
+    """Load (and optionally split) a PDF across the process pool, returned in page order."""
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+
+    total_pages = await loop.run_in_executor(executor, _count_pages, file_path)
+    tasks = [
+        loop.run_in_executor(executor, _load_page_range, file_path, start, start + PDF_PAGES_PER_TASK, chunk_size, chunk_overlap)
+        for start in range(0, total_pages, PDF_PAGES_PER_TASK)
+    ]
+
+    # gather keeps submission order, so the merged result is in page order
+    results = await asyncio.gather(*tasks)
+    return [doc for page_range in results for doc in page_range]
+
+async def iter_pdf(file_path: str, chunk_size: Optional[int] = None, chunk_overlap: int = 0, window: int = PDF_STREAM_WINDOW) -> AsyncIterator[Tuple[List["Document"], int, int]]:
+    """Stream a PDF as (documents, pages_done, total_pages) per page range, in page order.
+
+    At most `window` page ranges are parsed ahead of the consumer, so memory stays
+    bounded regardless of document size.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+
+    total_pages = await loop.run_in_executor(executor, _count_pages, file_path)
+    starts = iter(range(0, total_pages, PDF_PAGES_PER_TASK))
+    pending = deque()
+
+    def submit_next():
+        start = next(starts, None)
+        if start is not None:
+            end = min(start + PDF_PAGES_PER_TASK, total_pages)
+            pending.append((end, loop.run_in_executor(executor, _load_page_range, file_path, start, end, chunk_size, chunk_overlap)))
+
+    try:
+        for _ in range(max(1, window)):
+            submit_next()
+        while pending:
+            end, future = pending.popleft()
+            documents = await future
+            submit_next()
+            yield documents, end, total_pages
+    finally:
+        for _, future in pending:
+            future.cancel()
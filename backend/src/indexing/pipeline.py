@@ -1,73 +1,232 @@
 import os
 import uuid
-from typing import List
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient, models
+import asyncio
+import hashlib
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+from qdrant_client import AsyncQdrantClient, models
 
 from ..storage.db import storage
+from ..storage.vector_config import EMBEDDING_DIM, QDRANT_COLLECTION, SCOPE_PAYLOAD_FIELDS, collection_settings, document_id
+from ..services.embeddings import embedding_service
+from ..utils.lazy import LazyService
+from .loader import iter_pdf
+
+# Embedding upload tuning. Gemini accepts up to 100 texts per batch request; the
+# character budget keeps a batch of long chunks under the per-request token limit.
+INDEX_EMBED_CONCURRENCY = int(os.getenv("INDEX_EMBED_CONCURRENCY", 4))
+INDEX_BATCH_MAX_TEXTS = int(os.getenv("INDEX_BATCH_MAX_TEXTS", 100))
+INDEX_BATCH_MAX_CHARS = int(os.getenv("INDEX_BATCH_MAX_CHARS", 60000))
+
+# Fixed namespace so the same (document, chunk) always maps to the same Qdrant point ID
+CHUNK_NAMESPACE = uuid.UUID("6f1c1f8e-52a4-4c55-9a43-0d9b6c2a7e11")
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def chunk_point_id(doc_name: str, content_hash: str, occurrence: int = 0) -> str:
+    # Repeated boilerplate (headers, disclaimers) can produce identical chunks, so the
+    # occurrence number keeps their IDs distinct while staying deterministic.
+    return str(uuid.uuid5(CHUNK_NAMESPACE, f"{doc_name}:{content_hash}:{occurrence}"))
 
 class IndexingPipeline:
     def __init__(self):
-        # This specific preview key requires the 'models/' prefix and has 3072 dimensions
-        self.embeddings = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001")
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=100,
-            add_start_index=True
+        # Shared, cached gemini-embedding-001 client (EMBEDDING_DIM dimensions)
+        self.embeddings = embedding_service
+        # Splitting happens in the loader's worker processes (RecursiveCharacterTextSplitter)
+        self.chunk_size = 1000
+        self.chunk_overlap = 100
+        self._payload_indexed = set()
+
+    async def _load_manifest(self, doc_name: str, collection_name: str) -> Optional[Dict[str, Dict]]:
+        """Point IDs from the last indexing run, or None if the document has no manifest."""
+        db = storage.get_db()
+        if db is None:
+            return None
+        manifest = await db.chunk_manifests.find_one({"document_name": doc_name, "collection_name": collection_name})
+        return manifest.get("chunks", {}) if manifest else None
+
+    async def _save_manifest(self, doc_name: str, collection_name: str, chunks: Dict[str, Dict]):
+        db = storage.get_db()
+        if db is None:
+            return
+        await db.chunk_manifests.update_one(
+            {"document_name": doc_name, "collection_name": collection_name},
+            {"$set": {"chunks": chunks, "chunks_count": len(chunks), "updated_at": datetime.utcnow()}},
+            upsert=True
         )
 
-    async def index_document(self, file_path: str, doc_name: str, collection_name: str = "ALL_DOCS"):
-        # 1. Load PDF
-        loader = PyPDFLoader(file_path)
-        documents = loader.load()
+    def _plan_batches(self, chunks: List, point_ids: List[str]) -> List[tuple]:
+        # Pack chunks greedily up to the provider's per-request text and size limits
+        batches = []
+        batch_chunks, batch_ids, batch_chars = [], [], 0
+        for chunk, point_id in zip(chunks, point_ids):
+            size = len(chunk.page_content)
+            if batch_chunks and (len(batch_chunks) >= INDEX_BATCH_MAX_TEXTS or batch_chars + size > INDEX_BATCH_MAX_CHARS):
+                batches.append((batch_chunks, batch_ids))
+                batch_chunks, batch_ids, batch_chars = [], [], 0
+            batch_chunks.append(chunk)
+            batch_ids.append(point_id)
+            batch_chars += size
+        if batch_chunks:
+            batches.append((batch_chunks, batch_ids))
+        return batches
 
-        # 2. Split into chunks
-        chunks = self.text_splitter.split_documents(documents)
+    async def _embed_and_upsert(self, qdrant_client: AsyncQdrantClient, collection_name: str, chunks: List, point_ids: List[str], semaphore: asyncio.Semaphore) -> int:
+        # Rate limits and transient failures are retried by the shared embedding scheduler
+        async with semaphore:
+            vectors = await self.embeddings.aembed_documents([c.page_content for c in chunks])
 
-        # 3. Add metadata
-        for chunk in chunks:
-            chunk.metadata["document_name"] = doc_name
-            chunk.metadata["source_path"] = file_path
+        points = [
+            models.PointStruct(
+                id=point_id,
+                vector=vector,
+                # Same payload layout as langchain_qdrant so the stored points stay searchable through it
+                payload={"page_content": chunk.page_content, "metadata": chunk.metadata}
+            )
+            for chunk, point_id, vector in zip(chunks, point_ids, vectors)
+        ]
+        # wait=True so a failed write raises here instead of being recorded in the manifest;
+        # other batches keep embedding meanwhile, since the semaphore only covers the embed call
+        await qdrant_client.upsert(collection_name=collection_name, points=points, wait=True)
+        return len(points)
 
-        # 4. Store in Qdrant in batches
-        qdrant_client = storage.get_qdrant()
-        if qdrant_client:
-            # Ensure collection exists with correct dimensions (3072 for this preview model)
-            target_dim = 3072 
-            try:
-                info = qdrant_client.get_collection(collection_name)
-                current_dim = info.config.params.vectors.size
-                if current_dim != target_dim:
-                    print(f"Dimension mismatch ({current_dim} vs {target_dim}). Recreating collection...")
-                    qdrant_client.delete_collection(collection_name)
-            except Exception:
-                pass # Collection doesn't exist
-
-            if not qdrant_client.collection_exists(collection_name):
-                qdrant_client.create_collection(
-                    collection_name=collection_name,
-                    vectors_config=models.VectorParams(size=target_dim, distance=models.Distance.COSINE),
+    async def _ensure_collection(self, qdrant_client: AsyncQdrantClient, collection_name: str) -> bool:
+        """Create the collection if needed. Returns True when it was created (empty)."""
+        # Ensure collection exists with the configured (possibly truncated) dimensions
+        target_dim = EMBEDDING_DIM
+        if await qdrant_client.collection_exists(collection_name):
+            info = await qdrant_client.get_collection(collection_name)
+            current_dim = info.config.params.vectors.size
+            if current_dim != target_dim:
+                # Every document shares this collection: recreating it here would silently drop all
+                # of them, so changing dimensions is an explicit migration left to the operator
+                raise Exception(
+                    f"Collection {collection_name} stores {current_dim}-dim vectors but EMBEDDING_DIM is {target_dim}. "
+                    f"Set EMBEDDING_DIM back to {current_dim}, or point QDRANT_COLLECTION at a new collection and re-index all documents."
                 )
 
-            vector_db = QdrantVectorStore(
-                client=qdrant_client,
+        created = False
+        if not await qdrant_client.collection_exists(collection_name):
+            await qdrant_client.create_collection(
                 collection_name=collection_name,
-                embedding=self.embeddings
+                **collection_settings(target_dim),
             )
-            
-            # Process in batches to avoid timeouts
-            batch_size = 20
-            for i in range(0, len(chunks), batch_size):
-                batch = chunks[i : i + batch_size]
-                print(f"Indexing batch {i//batch_size + 1}/{(len(chunks)-1)//batch_size + 1} for {doc_name}...")
-                vector_db.add_documents(batch)
-            
-            print(f"Indexed {len(chunks)} chunks from {doc_name} into {collection_name}")
-            return len(chunks)
-        else:
+            created = True
+            # Manifests of every document point at vectors that no longer exist; without
+            # dropping them a re-index would find "no new chunks" and upload nothing
+            db = storage.get_db()
+            if db is not None:
+                result = await db.chunk_manifests.delete_many({"collection_name": collection_name})
+                if result.deleted_count:
+                    print(f"Dropped {result.deleted_count} chunk manifests for recreated collection {collection_name}")
+
+        if created or collection_name not in self._payload_indexed:
+            # Keyword indexes keep scope-filtered searches fast; creating one is idempotent
+            for field_name in SCOPE_PAYLOAD_FIELDS:
+                await qdrant_client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=models.PayloadSchemaType.KEYWORD,
+                )
+            self._payload_indexed.add(collection_name)
+        return created
+
+    async def index_document(self, file_path: str, doc_name: str, collection_name: str = QDRANT_COLLECTION, progress_callback: Optional[Callable[[int, int], Awaitable[None]]] = None):
+        qdrant_client = storage.get_qdrant()
+        if not qdrant_client:
             raise Exception("Qdrant client not initialized")
 
-indexing_pipeline = IndexingPipeline()
+        # A fresh collection holds none of the manifest's points
+        created = await self._ensure_collection(qdrant_client, collection_name)
+        previous = {} if created else await self._load_manifest(doc_name, collection_name)
+        if previous is None:
+            # Indexed before manifests existed (random point IDs) or never indexed:
+            # clear any points under this name so the upload below doesn't duplicate them
+            await qdrant_client.delete(
+                collection_name=collection_name,
+                points_selector=models.FilterSelector(filter=models.Filter(must=[
+                    models.FieldCondition(key="metadata.document_name", match=models.MatchValue(value=doc_name))
+                ])),
+                wait=True
+            )
+            previous = {}
+
+        manifest = {}
+        doc_id = document_id(doc_name)
+        occurrences: Dict[str, int] = {}
+        semaphore = asyncio.Semaphore(INDEX_EMBED_CONCURRENCY)
+        # Embed/upsert batches in flight, shared across page ranges so small ranges still overlap
+        uploads = set()
+        stats = {"new": 0, "moved": 0, "unchanged": 0}
+
+        # Pages stream through split -> embed -> upsert; only a bounded window of
+        # page ranges is held in memory, and each range is searchable once upserted.
+        try:
+            async for chunks, pages_done, total_pages in iter_pdf(file_path, chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap):
+                new_chunks, new_ids = [], []
+                moved_ops = []
+                for chunk in chunks:
+                    # Derive deterministic point IDs from the chunk content
+                    content_hash = chunk_hash(chunk.page_content)
+                    occurrence = occurrences.get(content_hash, 0)
+                    occurrences[content_hash] = occurrence + 1
+                    point_id = chunk_point_id(doc_name, content_hash, occurrence)
+
+                    chunk.metadata["document_name"] = doc_name
+                    chunk.metadata["document_id"] = doc_id
+                    chunk.metadata["source_path"] = file_path
+                    chunk.metadata["chunk_hash"] = content_hash
+
+                    # Diff against the manifest of the previous indexing run
+                    location = {"page": chunk.metadata.get("page"), "start_index": chunk.metadata.get("start_index")}
+                    manifest[point_id] = location
+                    if point_id not in previous:
+                        new_chunks.append(chunk)
+                        new_ids.append(point_id)
+                    elif previous[point_id] != location:
+                        # Same text, shifted position: refresh the citation metadata without re-embedding
+                        moved_ops.append(models.SetPayloadOperation(
+                            set_payload=models.SetPayload(payload={"metadata": chunk.metadata}, points=[point_id])
+                        ))
+                    else:
+                        stats["unchanged"] += 1
+
+                # Embed and upload new chunks without waiting for the range to finish; the loader
+                # only moves on once fewer than 2x INDEX_EMBED_CONCURRENCY batches are pending
+                for batch_chunks, batch_ids in self._plan_batches(new_chunks, new_ids):
+                    while len(uploads) >= 2 * INDEX_EMBED_CONCURRENCY:
+                        done, uploads = await asyncio.wait(uploads, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            task.result()
+                    uploads.add(asyncio.create_task(self._embed_and_upsert(qdrant_client, collection_name, batch_chunks, batch_ids, semaphore)))
+                if moved_ops:
+                    await qdrant_client.batch_update_points(collection_name=collection_name, update_operations=moved_ops)
+
+                stats["new"] += len(new_chunks)
+                stats["moved"] += len(moved_ops)
+                print(f"Indexed pages {pages_done}/{total_pages} for {doc_name}...")
+                if progress_callback:
+                    await progress_callback(pages_done, total_pages)
+
+            # Remaining batches; any failure surfaces here before the manifest is saved
+            await asyncio.gather(*uploads)
+        finally:
+            # On error, don't leave batches uploading after the job has failed
+            for task in uploads:
+                task.cancel()
+
+        stale_ids = [point_id for point_id in previous if point_id not in manifest]
+        if stale_ids:
+            await qdrant_client.delete(
+                collection_name=collection_name,
+                points_selector=models.PointIdsList(points=stale_ids)
+            )
+
+        await self._save_manifest(doc_name, collection_name, manifest)
+
+        print(f"{doc_name}: {stats['new']} new, {stats['moved']} moved, {len(stale_ids)} stale, {stats['unchanged']} unchanged chunks")
+        print(f"Indexed {len(manifest)} chunks from {doc_name} into {collection_name}")
+        return len(manifest)
+
+indexing_pipeline: IndexingPipeline = LazyService("indexing_pipeline", IndexingPipeline)
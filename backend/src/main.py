@@ -1,14 +1,33 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import os
+import asyncio
 from dotenv import load_dotenv
 
 from .storage.db import storage
-from .api import indexing, projects, answers, jobs
+from .indexing.loader import shutdown_executor
+from .api import indexing, projects, answers, jobs, metrics
+from .utils.lazy import record_timing, STARTUP_IMPORT_BUDGET_SECONDS
+from .workers.worker import Worker
 
 load_dotenv()
 
+# Development convenience: run a queue worker inside the API process.
+# In production set INLINE_WORKER=false and run `python -m src.workers.worker` instead.
+INLINE_WORKER = os.getenv("INLINE_WORKER", "true").lower() == "true"
+INLINE_WORKER_CONCURRENCY = int(os.getenv("INLINE_WORKER_CONCURRENCY", 2))
+
+# Services (Gemini clients, langchain, scipy) are built on first use, so this should stay small
+_import_seconds = time.perf_counter() - _IMPORT_STARTED
+record_timing("imports", _import_seconds)
+print(f"App imported in {_import_seconds:.2f}s")
+if _import_seconds > STARTUP_IMPORT_BUDGET_SECONDS:
+    print(f"WARNING: import time {_import_seconds:.2f}s exceeds budget of {STARTUP_IMPORT_BUDGET_SECONDS:.2f}s")
+
 app = FastAPI(title="Questionnaire Agent API")
 
 # Add CORS middleware
@@ -22,11 +41,21 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def startup_db_client():
+    started = time.perf_counter()
     await storage.connect()
+    record_timing("storage_connect", time.perf_counter() - started)
+    if INLINE_WORKER:
+        app.state.worker = Worker(INLINE_WORKER_CONCURRENCY)
+        app.state.worker_task = asyncio.create_task(app.state.worker.run())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if INLINE_WORKER:
+        # Unfinished jobs are requeued by another worker once their lease expires
+        app.state.worker.stop()
+        app.state.worker_task.cancel()
     await storage.disconnect()
+    shutdown_executor()
 
 @app.get("/health")
 async def health_check():
@@ -37,6 +66,7 @@ app.include_router(indexing.router)
 app.include_router(projects.router)
 app.include_router(answers.router)
 app.include_router(jobs.router)
+app.include_router(metrics.router)
 
 # Legacy Root Mounts (Optional, for backward compatibility if needed)
 # app.include_router(indexing.router, prefix="")
@@ -1,7 +1,8 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
 from datetime import datetime
 from enum import Enum
+from ..utils.ids import new_id
 
 class ProjectStatus(str, Enum):
     DRAFT = "DRAFT"
@@ -9,6 +10,7 @@ class ProjectStatus(str, Enum):
     COMPLETED = "COMPLETED"
     OUTDATED = "OUTDATED"
     FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
 
 class AnswerStatus(str, Enum):
     PENDING = "PENDING"
@@ -29,15 +31,17 @@ class JobStatus(str, Enum):
     RUNNING = "RUNNING"
     COMPLETED = "COMPLETED"
     FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
 
 class Citation(BaseModel):
     document_name: str
     text_snippet: str
     page_number: Optional[int] = None
     confidence: float = 0.0
+    chunk_id: Optional[str] = None
 
 class Answer(BaseModel):
-    id: str = Field(default_factory=lambda: "ans_" + datetime.now().strftime("%Y%m%d%H%M%S"))
+    id: str = Field(default_factory=lambda: new_id("ans"))
     question_id: str
     project_id: str
     answer_text: Optional[str] = None
@@ -46,6 +50,9 @@ class Answer(BaseModel):
     confidence_score: float = 0.0
     status: AnswerStatus = AnswerStatus.PENDING
     manual_overridden_text: Optional[str] = None
+    # Set when the answer was copied from a similar question instead of generated
+    reused_from: Optional[str] = None
+    reuse_similarity: Optional[float] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -57,10 +64,10 @@ class Question(BaseModel):
     order: int
 
 class Project(BaseModel):
-    id: str = Field(default_factory=lambda: "proj_" + datetime.now().strftime("%Y%m%d%H%M%S"))
+    id: str = Field(default_factory=lambda: new_id("proj"))
     name: str
     questionnaire_filename: str
-    document_scope: str = "ALL_DOCS" # or list of doc IDs
+    document_scope: Union[str, List[str]] = "ALL_DOCS" # or list of document names/IDs
     status: ProjectStatus = ProjectStatus.DRAFT
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -73,5 +80,13 @@ class RequestStatus(BaseModel):
     message: Optional[str] = None
     error: Optional[str] = None
     result: Optional[Dict] = None
+    # Durable queue fields (set for jobs run by workers)
+    task: Optional[str] = None
+    args: Optional[Dict] = None
+    attempts: int = 0
+    priority: int = 1
+    cancel_requested: bool = False
+    worker_id: Optional[str] = None
+    lease_until: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,143 @@
+import os
+import uuid
+import hashlib
+from typing import Dict, List, Optional, Union
+from qdrant_client import AsyncQdrantClient, models
+
+from ..storage.db import storage
+from ..storage.corpus import get_corpus_version
+from ..storage.vector_config import EMBEDDING_DIM, collection_settings, scope_key
+from ..models.models import Answer, AnswerStatus
+from .embeddings import embedding_service, TASK_QUERY
+
+ANSWER_REUSE_ENABLED = os.getenv("ANSWER_REUSE_ENABLED", "true").lower() == "true"
+ANSWER_REUSE_THRESHOLD = float(os.getenv("ANSWER_REUSE_THRESHOLD", 0.95))
+ANSWER_REUSE_COLLECTION = os.getenv("ANSWER_REUSE_COLLECTION", "ANSWER_REUSE")
+
+# Candidates fetched per question, so a rejected or edited top hit can fall back to the next one
+ANSWER_REUSE_CANDIDATES = int(os.getenv("ANSWER_REUSE_CANDIDATES", 3))
+
+REUSE_NAMESPACE = uuid.UUID("2b0b8f43-6a43-4c3e-8f1e-5d0a9c7e4b21")
+
+def normalize_question(text: str) -> str:
+    return " ".join(text.lower().split())
+
+class AnswerReuseService:
+    """Reuses answers of near-identical questions asked against the same scope and corpus version."""
+
+    def __init__(self):
+        self._collection_ready = False
+
+    async def _ensure_collection(self, qdrant_client: AsyncQdrantClient):
+        if self._collection_ready:
+            return
+        if not await qdrant_client.collection_exists(ANSWER_REUSE_COLLECTION):
+            await qdrant_client.create_collection(
+                collection_name=ANSWER_REUSE_COLLECTION,
+                **collection_settings(EMBEDDING_DIM, quantization="none"),
+            )
+        for field_name, schema in (("scope_key", models.PayloadSchemaType.KEYWORD), ("project_id", models.PayloadSchemaType.KEYWORD), ("corpus_version", models.PayloadSchemaType.INTEGER)):
+            await qdrant_client.create_payload_index(ANSWER_REUSE_COLLECTION, field_name=field_name, field_schema=schema)
+        self._collection_ready = True
+
+    def _reuse_filter(self, project_id: str, key: str, corpus_version: int) -> models.Filter:
+        return models.Filter(
+            must=[
+                models.FieldCondition(key="scope_key", match=models.MatchValue(value=key)),
+                models.FieldCondition(key="corpus_version", match=models.MatchValue(value=corpus_version)),
+            ],
+            # Never reuse the project's own answers, otherwise a forced regeneration would be a no-op
+            must_not=[models.FieldCondition(key="project_id", match=models.MatchValue(value=project_id))]
+        )
+
+    async def find_batch(self, project_id: str, questions: List[Dict], scope: Union[str, List[str]]) -> Dict[str, Answer]:
+        """Map question_id -> reused Answer for questions with a similar enough stored answer."""
+        qdrant_client = storage.get_qdrant()
+        if not ANSWER_REUSE_ENABLED or not qdrant_client or not questions:
+            return {}
+        await self._ensure_collection(qdrant_client)
+
+        # Query embeddings land in the shared cache, so retrieval reuses them afterwards
+        vectors = await embedding_service.aembed([q["text"] for q in questions], TASK_QUERY)
+        query_filter = self._reuse_filter(project_id, scope_key(scope), await get_corpus_version())
+        responses = await qdrant_client.query_batch_points(
+            collection_name=ANSWER_REUSE_COLLECTION,
+            requests=[
+                models.QueryRequest(query=vector, limit=ANSWER_REUSE_CANDIDATES, filter=query_filter, score_threshold=ANSWER_REUSE_THRESHOLD, with_payload=True)
+                for vector in vectors
+            ]
+        )
+
+        # Stored entries are snapshots: skip sources that were since rejected or edited by a reviewer
+        current = await self._current_sources([point for response in responses for point in response.points])
+
+        reused = {}
+        for question, response in zip(questions, responses):
+            hit = next((point for point in response.points if self._still_valid(point, current)), None)
+            if hit is None:
+                continue
+            source = hit.payload["answer"]
+            reused[question["id"]] = Answer(
+                question_id=question["id"],
+                project_id=project_id,
+                answer_text=source.get("answer_text"),
+                is_answerable=source.get("is_answerable", True),
+                citations=source.get("citations", []),
+                confidence_score=source.get("confidence_score", 0.0),
+                status=AnswerStatus.AI_GENERATED,
+                reused_from=source.get("id"),
+                reuse_similarity=float(hit.score)
+            )
+        return reused
+
+    async def _current_sources(self, points: List) -> Dict[tuple, Dict]:
+        db = storage.get_db()
+        ids = list({point.payload["answer"].get("id") for point in points})
+        if db is None or not ids:
+            return {}
+        answers = await db.answers.find({"id": {"$in": ids}}, {"_id": 0, "id": 1, "project_id": 1, "status": 1, "answer_text": 1}).to_list(None)
+        return {(answer["project_id"], answer["id"]): answer for answer in answers}
+
+    def _still_valid(self, point, current: Dict[tuple, Dict]) -> bool:
+        source = point.payload["answer"]
+        answer = current.get((point.payload.get("project_id"), source.get("id")))
+        return (
+            answer is not None
+            and answer.get("status") != AnswerStatus.REJECTED
+            and answer.get("answer_text") == source.get("answer_text")
+        )
+
+    async def remember(self, answer: Answer, question_text: str, scope: Union[str, List[str]], corpus_version: Optional[int] = None):
+        """Store a freshly generated answer so later projects can reuse it."""
+        # Best effort: a failed write only means this answer won't be offered for reuse
+        try:
+            qdrant_client = storage.get_qdrant()
+            if not ANSWER_REUSE_ENABLED or not qdrant_client or answer.reused_from:
+                return
+            await self._ensure_collection(qdrant_client)
+
+            if corpus_version is None:
+                corpus_version = await get_corpus_version()
+            key = scope_key(scope)
+            question_hash = hashlib.sha256(normalize_question(question_text).encode("utf-8")).hexdigest()
+            vector = (await embedding_service.aembed([question_text], TASK_QUERY))[0]
+            await qdrant_client.upsert(
+                collection_name=ANSWER_REUSE_COLLECTION,
+                points=[models.PointStruct(
+                    # One entry per (project, scope, question); newer answers replace older ones
+                    id=str(uuid.uuid5(REUSE_NAMESPACE, f"{answer.project_id}:{key}:{question_hash}")),
+                    vector=vector,
+                    payload={
+                        "scope_key": key,
+                        "project_id": answer.project_id,
+                        "corpus_version": corpus_version,
+                        "question_text": question_text,
+                        "answer": answer.dict(include={"id", "answer_text", "is_answerable", "citations", "confidence_score"})
+                    }
+                )],
+                wait=False
+            )
+        except Exception as e:
+            print(f"Failed to store answer {answer.id} for reuse: {e}")
+
+answer_reuse_service = AnswerReuseService()
@@ -0,0 +1,97 @@
+import os
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+# Approximate prompt budget for retrieved context (~4 characters per token)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 2000))
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", 0.85))
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = text.lower().split()
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+def _similarity(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def _merge_adjacent(docs: List[Tuple["Document", float]]) -> List[Dict]:
+    """Merge chunks of the same document page whose [start, end) ranges touch or overlap."""
+    groups: Dict[tuple, List[Dict]] = {}
+    passages = []
+    for rank, (doc, score) in enumerate(docs):
+        start = doc.metadata.get("start_index")
+        passage = {"text": doc.page_content, "start": start, "score": score, "rank": rank}
+        if start is None:
+            # No offsets to merge on; keep as-is
+            passages.append(passage)
+            continue
+        key = (doc.metadata.get("document_name"), doc.metadata.get("page"))
+        groups.setdefault(key, []).append(passage)
+
+    for group in groups.values():
+        group.sort(key=lambda p: p["start"])
+        current = group[0]
+        for nxt in group[1:]:
+            current_end = current["start"] + len(current["text"])
+            if nxt["start"] <= current_end:
+                # Append only the part of the next chunk past the overlap
+                tail = nxt["text"][current_end - nxt["start"]:]
+                current["text"] += tail
+                current["score"] = max(current["score"], nxt["score"])
+                current["rank"] = min(current["rank"], nxt["rank"])
+            else:
+                passages.append(current)
+                current = nxt
+        passages.append(current)
+
+    # Best retrieval rank first
+    passages.sort(key=lambda p: p["rank"])
+    return passages
+
+def assemble_context(docs: List[Tuple["Document", float]], token_budget: int = CONTEXT_TOKEN_BUDGET) -> Tuple[str, Dict]:
+    """Build the prompt context from retrieved chunks: merge overlaps, drop near-duplicates, fit the budget."""
+    passages = _merge_adjacent(docs)
+
+    selected, selected_shingles = [], []
+    duplicates, truncated, dropped = 0, 0, 0
+    used_tokens = 0
+    for passage in passages:
+        shingles = _shingles(passage["text"])
+        if any(_similarity(shingles, other) >= NEAR_DUPLICATE_THRESHOLD for other in selected_shingles):
+            duplicates += 1
+            continue
+
+        tokens = estimate_tokens(passage["text"])
+        remaining = token_budget - used_tokens
+        if tokens > remaining:
+            if selected:
+                dropped += 1
+                continue
+            # Always keep something from the best passage
+            passage["text"] = passage["text"][: max(0, remaining) * 4]
+            tokens = estimate_tokens(passage["text"])
+            truncated += 1
+
+        selected.append(passage["text"])
+        selected_shingles.append(shingles)
+        used_tokens += tokens
+
+    raw_tokens = sum(estimate_tokens(doc.page_content) for doc, _ in docs)
+    stats = {
+        "chunks": len(docs),
+        "passages": len(selected),
+        "near_duplicates": duplicates,
+        "over_budget": dropped,
+        "truncated": truncated,
+        "raw_context_tokens": raw_tokens,
+        "context_tokens": used_tokens,
+    }
+    return "\n---\n".join(selected), stats
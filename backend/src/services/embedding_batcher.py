@@ -0,0 +1,86 @@
+import os
+import time
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from .embeddings import embedding_service, EmbeddingService, TASK_QUERY
+
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", 100))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", 10))
+
+class EmbeddingBatcher:
+    """Collects concurrent single-text embed requests and sends them as one batch call."""
+
+    def __init__(self, embeddings: EmbeddingService, task_type: str = TASK_QUERY, max_batch_size: int = EMBED_BATCH_MAX_SIZE, max_wait_ms: float = EMBED_BATCH_MAX_WAIT_MS):
+        self.embeddings = embeddings
+        self.task_type = task_type
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[str, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight = set()
+        self.stats = {"requests": 0, "lru_hits": 0, "batches": 0, "batched_texts": 0, "max_batch_size": 0, "failed_batches": 0, "batch_seconds": 0.0, "queue_wait_seconds": 0.0}
+
+    async def embed(self, text: str) -> List[float]:
+        self.stats["requests"] += 1
+
+        # Hot texts are answered straight from the in-process LRU without waiting for a batch
+        cached = self.embeddings.get_cached(text, self.task_type)
+        if cached is not None:
+            self.stats["lru_hits"] += 1
+            return cached
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future, float]]):
+        started = time.perf_counter()
+        self.stats["batches"] += 1
+        self.stats["batched_texts"] += len(batch)
+        self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(batch))
+        self.stats["queue_wait_seconds"] += sum(started - enqueued for _, _, enqueued in batch)
+        try:
+            vectors = await self.embeddings.aembed([text for text, _, _ in batch], self.task_type)
+        except Exception as e:
+            self.stats["failed_batches"] += 1
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.stats["batch_seconds"] += time.perf_counter() - started
+
+        for (_, future, _), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def get_stats(self) -> Dict:
+        batches = self.stats["batches"]
+        batched = self.stats["batched_texts"]
+        return {
+            **self.stats,
+            "max_wait_ms": self.max_wait * 1000,
+            "configured_max_batch_size": self.max_batch_size,
+            "avg_batch_size": batched / batches if batches else 0.0,
+            "avg_batch_latency_ms": 1000 * self.stats["batch_seconds"] / batches if batches else 0.0,
+            "avg_queue_wait_ms": 1000 * self.stats["queue_wait_seconds"] / batched if batched else 0.0,
+        }
+
+# Query-side embeddings (generation retrieval and evaluation) share one batcher
+query_batcher = EmbeddingBatcher(embedding_service, TASK_QUERY)
@@ -0,0 +1,248 @@
+import os
+import time
+import sqlite3
+import hashlib
+import asyncio
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from ..storage.vector_config import EMBEDDING_DIM, truncate_vector
+from ..utils.lazy import LazyService
+from .scheduler import embedding_scheduler
+
+EMBEDDING_MODEL = "models/gemini-embedding-001"
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(_BACKEND_DIR, ".cache", "embeddings.sqlite3"))
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", 1024))
+# Every worker process shares the SQLite file: wait this long for another writer's lock
+EMBEDDING_CACHE_BUSY_TIMEOUT = float(os.getenv("EMBEDDING_CACHE_BUSY_TIMEOUT", 5.0))
+# Puts between re-reading the on-disk size (other processes' writes aren't seen otherwise)
+EMBEDDING_CACHE_SIZE_RESYNC_PUTS = 100
+# Vectors kept in memory as float32 arrays (~12 KB each at 3072 dims, ~60 MB at the default size)
+EMBEDDING_CACHE_LRU_SIZE = int(os.getenv("EMBEDDING_CACHE_LRU_SIZE", 5000))
+
+# Gemini embeds queries and documents differently, so the task type is part of the key
+TASK_DOCUMENT = "RETRIEVAL_DOCUMENT"
+TASK_QUERY = "RETRIEVAL_QUERY"
+
+class EmbeddingCache:
+    """On-disk SQLite embedding store with an in-process LRU in front of it."""
+
+    def __init__(self, path: str, max_bytes: int, lru_size: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lru_size = lru_size
+        # float32 arrays rather than lists of Python floats: about 8x smaller per vector
+        self.lru: "OrderedDict[str, array]" = OrderedDict()
+        self.lock = threading.Lock()
+        # The LRU is touched from the event loop and from to_thread workers; its own short-held
+        # lock keeps loop-side lookups from waiting on SQLite I/O under self.lock
+        self.lru_lock = threading.Lock()
+        self.conn = None
+        # Running estimate of the on-disk size, so puts don't SUM the whole table
+        self.total_bytes = 0
+        self.puts_since_sync = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(self.path, timeout=EMBEDDING_CACHE_BUSY_TIMEOUT, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+            self.total_bytes = self._disk_size(self.conn)
+        return self.conn
+
+    def _disk_size(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    def _remember(self, key: str, vector: array):
+        with self.lru_lock:
+            self.lru[key] = vector
+            self.lru.move_to_end(key)
+            while len(self.lru) > self.lru_size:
+                self.lru.popitem(last=False)
+
+    def get_lru(self, key: str) -> Optional[List[float]]:
+        with self.lru_lock:
+            vector = self.lru.get(key)
+            if vector is not None:
+                self.lru.move_to_end(key)
+        return vector.tolist() if vector is not None else None
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        if not keys:
+            return {}
+        found = {}
+        with self.lock:
+            conn = self._connect()
+            try:
+                for i in range(0, len(keys), 500):
+                    part = keys[i : i + 500]
+                    placeholders = ",".join("?" * len(part))
+                    rows = conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part).fetchall()
+                    for key, blob in rows:
+                        found[key] = array("f", blob)
+                if found:
+                    conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(time.time(), k) for k in found])
+                    conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+            for key, vector in found.items():
+                self._remember(key, vector)
+        return {key: vector.tolist() for key, vector in found.items()}
+
+    def put_many(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        now = time.time()
+        with self.lock:
+            conn = self._connect()
+            rows = []
+            for key, vector in items.items():
+                packed = array("f", vector)
+                blob = packed.tobytes()
+                rows.append((key, blob, len(blob), now))
+                self._remember(key, packed)
+            try:
+                conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector, size, last_used) VALUES (?, ?, ?, ?)", rows)
+                conn.commit()
+                # Replaced rows are counted twice and other processes' writes not at all; both are corrected at the next resync
+                self.total_bytes += sum(row[2] for row in rows)
+                self.puts_since_sync += 1
+                self._evict(conn)
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+
+    def _evict(self, conn: sqlite3.Connection):
+        # Size-based eviction: drop least recently used rows until 90% of the budget.
+        # The exact size is only re-read when the estimate says we're over, or periodically.
+        if self.total_bytes <= self.max_bytes and self.puts_since_sync < EMBEDDING_CACHE_SIZE_RESYNC_PUTS:
+            return
+        total = self.total_bytes = self._disk_size(conn)
+        self.puts_since_sync = 0
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        freed = 0
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM embeddings ORDER BY last_used ASC"):
+            if total - freed <= target:
+                break
+            doomed.append((key,))
+            freed += size
+        conn.executemany("DELETE FROM embeddings WHERE key = ?", doomed)
+        conn.commit()
+        self.total_bytes = total - freed
+        with self.lru_lock:
+            for (key,) in doomed:
+                self.lru.pop(key, None)
+
+    def disk_stats(self) -> Dict:
+        with self.lock:
+            count, size = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings").fetchone()
+        return {"entries": count, "bytes": size, "max_bytes": self.max_bytes}
+
+class EmbeddingService:
+    """Gemini embeddings shared by indexing, generation and evaluation, backed by EmbeddingCache."""
+
+    def __init__(self, model: str = EMBEDDING_MODEL, dim: int = EMBEDDING_DIM):
+        self.model = model
+        self.dim = dim
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        self.client = GoogleGenerativeAIEmbeddings(model=model)
+        self.cache = EmbeddingCache(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_MB * 1024 * 1024, EMBEDDING_CACHE_LRU_SIZE)
+        self.stats = {"lru_hits": 0, "disk_hits": 0, "misses": 0, "api_calls": 0, "api_seconds": 0.0, "cache_errors": 0}
+
+    def _key(self, text: str, task_type: str) -> str:
+        return hashlib.sha256(f"{self.model}:{task_type}:{text}".encode("utf-8")).hexdigest()
+
+    def _lookup_lru(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        for key in keys:
+            vector = self.cache.get_lru(key)
+            if vector is not None:
+                found[key] = vector
+        self.stats["lru_hits"] += len(found)
+        return found
+
+    def get_cached(self, text: str, task_type: str = TASK_QUERY) -> Optional[List[float]]:
+        """LRU-only lookup; never touches disk or the API."""
+        vector = self.cache.get_lru(self._key(text, task_type))
+        if vector is None:
+            return None
+        self.stats["lru_hits"] += 1
+        return truncate_vector(vector, self.dim)
+
+    def _assemble(self, keys: List[str], found: Dict[str, List[float]]) -> List[List[float]]:
+        # The cache holds full vectors; truncation is applied on the way out
+        return [truncate_vector(found[key], self.dim) for key in keys]
+
+    async def aembed(self, texts: List[str], task_type: str = TASK_DOCUMENT) -> List[List[float]]:
+        keys = [self._key(text, task_type) for text in texts]
+        found = self._lookup_lru(keys)
+
+        remaining = list(dict.fromkeys(k for k in keys if k not in found))
+        if remaining:
+            try:
+                from_disk = await asyncio.to_thread(self.cache.get_many, remaining)
+            except Exception as e:
+                # A cache outage (locked database, full disk) must never fail embedding: ask the API instead
+                print(f"Embedding cache read failed: {e}")
+                self.stats["cache_errors"] += 1
+                from_disk = {}
+            self.stats["disk_hits"] += len(from_disk)
+            found.update(from_disk)
+
+        missing = [(key, text) for key, text in dict(zip(keys, texts)).items() if key not in found]
+        if missing:
+            self.stats["misses"] += len(missing)
+            self.stats["api_calls"] += 1
+            started = time.perf_counter()
+            batch = [text for _, text in missing]
+            # Rough token count (~4 chars per token) for the TPM bucket
+            tokens = sum(len(text) for text in batch) // 4 + 1
+            vectors = await embedding_scheduler.run(lambda: self.client.aembed_documents(batch, task_type=task_type), tokens=tokens)
+            self.stats["api_seconds"] += time.perf_counter() - started
+            fresh = {key: vector for (key, _), vector in zip(missing, vectors)}
+            try:
+                await asyncio.to_thread(self.cache.put_many, fresh)
+            except Exception as e:
+                # The vectors are already paid for; losing the cache write only costs a later API call
+                print(f"Embedding cache write failed: {e}")
+                self.stats["cache_errors"] += 1
+            found.update(fresh)
+
+        return self._assemble(keys, found)
+
+    # Async counterparts of langchain's Embeddings methods; there is no sync path, so every
+    # provider call goes through the quota scheduler
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.aembed(texts, TASK_DOCUMENT)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed([text], TASK_QUERY))[0]
+
+    def get_stats(self) -> Dict:
+        hits = self.stats["lru_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        api_calls = self.stats["api_calls"]
+        misses = self.stats["misses"]
+        seconds_per_text = self.stats["api_seconds"] / misses if misses else 0.0
+        return {
+            **self.stats,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "avg_api_call_seconds": self.stats["api_seconds"] / api_calls if api_calls else 0.0,
+            # Rough saving: each hit would otherwise have cost its share of an API call
+            "estimated_seconds_saved": hits * seconds_per_text,
+            "lru_entries": len(self.cache.lru),
+            "disk": self.cache.disk_stats(),
+        }
+
+embedding_service: EmbeddingService = LazyService("embedding_service", EmbeddingService)
@@ -1,20 +1,54 @@
 import os
-from typing import List, Tuple
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Tuple, Union
 import asyncio
-from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from langchain_qdrant import QdrantVectorStore
-from langchain_core.prompts import ChatPromptTemplate
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, models
+from pydantic import BaseModel, Field
 
 from ..storage.db import storage
+from ..storage.corpus import get_corpus_version
+from ..storage.vector_config import QDRANT_COLLECTION, search_params, scope_filter
 from ..models.models import Answer, Citation, AnswerStatus
+from .embeddings import embedding_service, TASK_QUERY
+from .embedding_batcher import query_batcher
+from .retrieval_cache import retrieval_cache
+from .context import assemble_context, estimate_tokens, CONTEXT_TOKEN_BUDGET
+from .scheduler import llm_scheduler
+from ..utils.lazy import LazyService
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+# Qdrant search requests sent per batch call
+RETRIEVAL_BATCH_SIZE = int(os.getenv("RETRIEVAL_BATCH_SIZE", 64))
+# Context budget for one multi-question LLM call
+GENERATION_BATCH_MAX_CONTEXT_TOKENS = int(os.getenv("GENERATION_BATCH_MAX_CONTEXT_TOKENS", 8000))
+# Expected completion size per answer, reserved in the scheduler's TPM bucket
+LLM_OUTPUT_TOKENS_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKENS_ESTIMATE", 300))
+
+class BatchAnswerItem(BaseModel):
+    question_id: str = Field(description="Label of the question, e.g. Q1")
+    answer: str = Field(description="Brief, factual answer")
+    confidence: float = Field(description="Confidence between 0.0 and 1.0")
+    answerable: bool = Field(description="False if the context does not contain the answer")
+
+class BatchAnswerResponse(BaseModel):
+    answers: List[BatchAnswerItem]
 
 class GenerationService:
     def __init__(self):
+        # Deferred so importing the API doesn't load the Gemini SDK (or need credentials)
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        from langchain_core.prompts import ChatPromptTemplate
+
         # This preview key requires models/gemini-embedding-001 (3072 dim) and models/gemini-3-flash-preview
-        self.llm = ChatGoogleGenerativeAI(model="models/gemini-3-flash-preview")
-        self.embeddings = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001")
+        # Retries belong to llm_scheduler (it honours retryDelay and trips the shared breaker).
+        # max_retries=1 is a single attempt; 0 would mean "SDK default" (6 attempts).
+        self.llm = ChatGoogleGenerativeAI(model="models/gemini-3-flash-preview", max_retries=1)
+        self.embeddings = embedding_service
+        self.stats = {"answers": 0, "llm_calls": 0, "prompt_tokens": 0, "context_tokens": 0, "raw_context_tokens": 0}
+        # Built once and reused across calls
+        self._chains = {}
+        self._search_settings = {}
         
         self.prompt_template = ChatPromptTemplate.from_template("""
         You are a Due Diligence expert. Answer the following question based ONLY on the provided context.
@@ -31,37 +65,100 @@ class GenerationService:
         Citations: [List of specific snippets used]
         """)
 
-    @retry(
-        wait=wait_exponential(multiplier=1, min=4, max=60),
-        stop=stop_after_attempt(5),
-        retry=retry_if_exception_type(Exception), # Standard LangChain/Google errors
-        reraise=True
-    )
-    async def generate_answer(self, project_id: str, question_id: str, question_text: str, collection_name: str = "ALL_DOCS") -> Answer:
+        self.batch_prompt_template = ChatPromptTemplate.from_template("""
+        You are a Due Diligence expert. Answer each of the following questions based ONLY on the provided context.
+        If the answer to a question is not in the context, state that it is not possible to answer and mark it as not answerable.
+
+        Questions:
+        {questions}
+
+        Context:
+        {context}
+
+        Return one entry per question, using the question's label (e.g. Q1) as question_id.
+        Give a brief, factual answer and a confidence between 0.0 and 1.0.
+        """)
+
+    def _chain(self, name: str):
+        if name not in self._chains:
+            if name == "batch":
+                self._chains[name] = self.batch_prompt_template | self.llm.with_structured_output(BatchAnswerResponse, include_raw=True)
+            else:
+                self._chains[name] = self.prompt_template | self.llm
+        return self._chains[name]
+
+    def _collection_settings(self, collection_name: str = QDRANT_COLLECTION) -> Dict:
+        # Search settings per collection, resolved on first use
+        if collection_name not in self._search_settings:
+            self._search_settings[collection_name] = {"collection_name": collection_name, "params": search_params()}
+        return self._search_settings[collection_name]
+
+    def _to_documents(self, points) -> List[Tuple["Document", float]]:
+        from langchain_core.documents import Document
+        return [
+            # The point ID lets citations refer back to the original chunk
+            (Document(page_content=point.payload.get("page_content", ""), metadata={**(point.payload.get("metadata") or {}), "_id": str(point.id)}), point.score)
+            for point in points
+        ]
+
+    async def _search(self, qdrant_client: AsyncQdrantClient, question_text: str, scope: Union[str, List[str]], k: int = 5) -> List[Tuple["Document", float]]:
+        # Unchanged corpus + same question: skip the embedding call and the vector search
+        corpus_version = await get_corpus_version()
+        cached = await retrieval_cache.get(scope, question_text, k, corpus_version)
+        if cached is not None:
+            return cached
+
+        # Concurrent questions share embedding requests through the micro-batcher
+        query_vector = await query_batcher.embed(question_text)
+        # Scoped projects filter the shared collection by document (payload-indexed)
+        settings = self._collection_settings()
+        result = await qdrant_client.query_points(
+            collection_name=settings["collection_name"],
+            query=query_vector,
+            limit=k,
+            query_filter=scope_filter(scope),
+            search_params=settings["params"],
+            with_payload=True
+        )
+        docs = self._to_documents(result.points)
+        await retrieval_cache.set(scope, question_text, k, docs, corpus_version)
+        return docs
+
+    async def retrieve_batch(self, question_texts: List[str], scope: Union[str, List[str]], k: int = 5) -> List[List[Tuple["Document", float]]]:
+        """Retrieve context for many questions with batched embedding and search round trips."""
         qdrant_client = storage.get_qdrant()
         if not qdrant_client:
             raise Exception("Qdrant client not initialized")
+        if not question_texts:
+            return []
 
-        vector_db = QdrantVectorStore(
-            client=qdrant_client,
-            collection_name=collection_name,
-            embedding=self.embeddings
-        )
+        corpus_version = await get_corpus_version()
+        results = await retrieval_cache.get_many(scope, question_texts, k, corpus_version)
+        misses = [i for i, docs in enumerate(results) if docs is None]
+        if not misses:
+            return results
 
-        # 1. Retrieve relevant chunks
-        docs = vector_db.similarity_search_with_score(question_text, k=5)
-        
-        context_text = "\n---\n".join([d[0].page_content for d in docs])
-        
-        # 2. Invoke LLM using the prompt template
-        chain = self.prompt_template | self.llm
-        response = await chain.ainvoke({
-            "question": question_text,
-            "context": context_text
-        })
-        
-        # 3. Parse LLM response (Handling Gemini 3 List-style content)
-        content = response.content
+        vectors = await self.embeddings.aembed([question_texts[i] for i in misses], TASK_QUERY)
+        query_filter = scope_filter(scope)
+        settings = self._collection_settings()
+        params = settings["params"]
+
+        for start in range(0, len(misses), RETRIEVAL_BATCH_SIZE):
+            batch = misses[start : start + RETRIEVAL_BATCH_SIZE]
+            responses = await qdrant_client.query_batch_points(
+                collection_name=settings["collection_name"],
+                requests=[
+                    models.QueryRequest(query=vector, limit=k, filter=query_filter, params=params, with_payload=True)
+                    for vector in vectors[start : start + RETRIEVAL_BATCH_SIZE]
+                ]
+            )
+            for i, response in zip(batch, responses):
+                results[i] = self._to_documents(response.points)
+        await retrieval_cache.set_many(scope, {question_texts[i]: results[i] for i in misses}, k, corpus_version)
+        return results
+
+    def _parse_response(self, content) -> Tuple[str, float]:
+        # Handling Gemini 3 List-style content
         if isinstance(content, list):
             # Extract text from the first message block
             content = " ".join([block.get("text", "") for block in content if isinstance(block, dict)])
@@ -90,16 +187,58 @@ class GenerationService:
                         confidence = float(match.group(1))
                 except:
                     pass
+        return answer_text, confidence
 
-        # 4. Map citations
-        citations = []
-        for doc, score in docs:
-            citations.append(Citation(
+    def _build_citations(self, docs: List[Tuple["Document", float]]) -> List[Citation]:
+        return [
+            Citation(
                 document_name=doc.metadata.get("document_name", "Unknown"),
+                chunk_id=doc.metadata.get("_id"),
                 text_snippet=doc.page_content[:200] + "...",
                 page_number=doc.metadata.get("page", 0) + 1,
                 confidence=float(score)
-            ))
+            )
+            for doc, score in docs
+        ]
+
+    def _estimate_call_tokens(self, inputs: Dict[str, str], answers: int = 1) -> int:
+        # Prompt estimate plus room for the completion, charged against the TPM bucket
+        return estimate_tokens("".join(inputs.values())) + LLM_OUTPUT_TOKENS_ESTIMATE * answers
+
+    def _record_usage(self, label: str, response, context_stats: Dict, answers: int = 1):
+        usage = getattr(response, "usage_metadata", None) or {}
+        prompt_tokens = usage.get("input_tokens", 0)
+        self.stats["answers"] += answers
+        self.stats["llm_calls"] += 1
+        self.stats["prompt_tokens"] += prompt_tokens
+        self.stats["context_tokens"] += context_stats["context_tokens"]
+        self.stats["raw_context_tokens"] += context_stats["raw_context_tokens"]
+        print(f"Answer {label}: {prompt_tokens} prompt tokens, context {context_stats['raw_context_tokens']} -> {context_stats['context_tokens']} est. tokens ({context_stats['chunks']} chunks -> {context_stats['passages']} passages)")
+
+    async def generate_answer(self, project_id: str, question_id: str, question_text: str, scope: Union[str, List[str]] = "ALL_DOCS", retrieved: Optional[List[Tuple["Document", float]]] = None) -> Answer:
+        # 1. Retrieve relevant chunks (unless a batch retrieval already did)
+        docs = retrieved
+        if docs is None:
+            qdrant_client = storage.get_qdrant()
+            if not qdrant_client:
+                raise Exception("Qdrant client not initialized")
+            docs = await self._search(qdrant_client, question_text, scope, k=5)
+
+        # Merge overlapping neighbours, drop near-duplicates and fit the token budget
+        context_text, context_stats = assemble_context(docs)
+        
+        # 2. Invoke LLM using the prompt template
+        chain = self._chain("answer")
+        inputs = {"question": question_text, "context": context_text}
+        response = await llm_scheduler.run(lambda: chain.ainvoke(inputs), tokens=self._estimate_call_tokens(inputs))
+        
+        self._record_usage(question_id, response, context_stats)
+
+        # 3. Parse LLM response
+        answer_text, confidence = self._parse_response(response.content)
+
+        # 4. Map citations
+        citations = self._build_citations(docs)
 
         return Answer(
             question_id=question_id,
@@ -111,4 +250,119 @@ class GenerationService:
             status=AnswerStatus.AI_GENERATED
         )
 
-generation_service = GenerationService()
+    async def generate_answers_batch(self, project_id: str, questions: List[Dict], scope: Union[str, List[str]] = "ALL_DOCS", retrieved: Optional[Dict[str, List[Tuple["Document", float]]]] = None) -> Dict[str, Answer]:
+        """Answer several related questions with one structured-output LLM call.
+
+        Returns question_id -> Answer; questions the model skipped are left out so the
+        caller can fall back to generate_answer for them.
+        """
+        retrieved = retrieved or {}
+        docs_by_question = {}
+        for question in questions:
+            docs = retrieved.get(question["id"])
+            if docs is None:
+                qdrant_client = storage.get_qdrant()
+                if not qdrant_client:
+                    raise Exception("Qdrant client not initialized")
+                docs = await self._search(qdrant_client, question["text"], scope, k=5)
+            docs_by_question[question["id"]] = docs
+
+        # Shared context: interleave each question's results by rank so every question's
+        # best chunk comes first, and let assembly drop the chunks questions have in common.
+        union, seen = [], set()
+        for rank in range(max(len(d) for d in docs_by_question.values()) if docs_by_question else 0):
+            for docs in docs_by_question.values():
+                if rank < len(docs):
+                    doc, score = docs[rank]
+                    chunk_key = doc.metadata.get("_id") or doc.page_content
+                    if chunk_key not in seen:
+                        seen.add(chunk_key)
+                        union.append((doc, score))
+        budget = min(CONTEXT_TOKEN_BUDGET * len(questions), GENERATION_BATCH_MAX_CONTEXT_TOKENS)
+        context_text, context_stats = assemble_context(union, token_budget=budget)
+
+        labels = {f"Q{i + 1}": question for i, question in enumerate(questions)}
+        chain = self._chain("batch")
+        inputs = {
+            "questions": "\n".join(f"{label}: {question['text']}" for label, question in labels.items()),
+            "context": context_text
+        }
+        output = await llm_scheduler.run(lambda: chain.ainvoke(inputs), tokens=self._estimate_call_tokens(inputs, answers=len(questions)))
+        self._record_usage(f"batch of {len(questions)}", output.get("raw"), context_stats, answers=len(questions))
+
+        parsed = output.get("parsed")
+        if parsed is None:
+            raise Exception(f"Structured output could not be parsed: {output.get('parsing_error')}")
+
+        answers = {}
+        for item in parsed.answers:
+            question = labels.get(item.question_id.strip())
+            if not question:
+                continue
+            # Each answer keeps the citations of its own retrieval
+            answers[question["id"]] = Answer(
+                question_id=question["id"],
+                project_id=project_id,
+                answer_text=item.answer,
+                is_answerable=item.answerable and "not possible to answer" not in item.answer.lower(),
+                citations=self._build_citations(docs_by_question[question["id"]]),
+                confidence_score=max(0.0, min(1.0, item.confidence)),
+                status=AnswerStatus.AI_GENERATED
+            )
+        return answers
+
+    async def stream_answer(self, project_id: str, question_id: str, question_text: str, scope: Union[str, List[str]] = "ALL_DOCS") -> AsyncIterator[Tuple[str, object]]:
+        """Yield ("citations", [...]), then ("token", text) as the LLM streams, then ("answer", Answer)."""
+        qdrant_client = storage.get_qdrant()
+        if not qdrant_client:
+            raise Exception("Qdrant client not initialized")
+        docs = await self._search(qdrant_client, question_text, scope, k=5)
+
+        # Citations are known as soon as retrieval finishes, so they go out first
+        citations = self._build_citations(docs)
+        yield "citations", [citation.dict() for citation in citations]
+
+        context_text, context_stats = assemble_context(docs)
+        chain = self._chain("answer")
+        inputs = {"question": question_text, "context": context_text}
+        # A stream can't be replayed once tokens went out, so it is admitted once and
+        # only reports failures to the scheduler (a 429 still pauses everyone else).
+        await llm_scheduler.acquire(self._estimate_call_tokens(inputs))
+        response = None
+        try:
+            async for chunk in chain.astream(inputs):
+                response = chunk if response is None else response + chunk
+                text = chunk.content
+                if isinstance(text, list):
+                    text = "".join(block.get("text", "") for block in text if isinstance(block, dict))
+                if text:
+                    yield "token", text
+        except Exception as e:
+            llm_scheduler.record_error(e)
+            raise
+
+        if response is None:
+            raise Exception("LLM returned an empty stream")
+        self._record_usage(question_id, response, context_stats)
+        answer_text, confidence = self._parse_response(response.content)
+
+        yield "answer", Answer(
+            question_id=question_id,
+            project_id=project_id,
+            answer_text=answer_text,
+            is_answerable="not possible to answer" not in answer_text.lower(),
+            citations=citations,
+            confidence_score=confidence,
+            status=AnswerStatus.AI_GENERATED
+        )
+
+    def get_stats(self):
+        answers = self.stats["answers"]
+        return {
+            **self.stats,
+            "avg_prompt_tokens": self.stats["prompt_tokens"] / answers if answers else 0.0,
+            "answers_per_llm_call": answers / self.stats["llm_calls"] if self.stats["llm_calls"] else 0.0,
+            "context_tokens_saved": self.stats["raw_context_tokens"] - self.stats["context_tokens"],
+        }
+
+generation_service: GenerationService = LazyService("generation_service", GenerationService)
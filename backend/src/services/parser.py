@@ -1,12 +1,11 @@
 import re
 from typing import List
-from langchain_community.document_loaders import PyPDFLoader
 from ..models.models import Question
+from ..indexing.loader import load_pdf
 
 class QuestionnaireParser:
-    def parse(self, file_path: str, project_id: str) -> List[Question]:
-        loader = PyPDFLoader(file_path)
-        documents = loader.load()
+    async def parse(self, file_path: str, project_id: str) -> List[Question]:
+        documents = await load_pdf(file_path)
         
         full_text = "\n".join([d.page_content for d in documents])
         
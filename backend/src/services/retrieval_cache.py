@@ -0,0 +1,157 @@
+import os
+import json
+import hashlib
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+from ..storage.corpus import get_corpus_version
+from ..storage.vector_config import scope_key
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", 5000))
+RETRIEVAL_CACHE_REDIS_URL = os.getenv("RETRIEVAL_CACHE_REDIS_URL")
+RETRIEVAL_CACHE_TTL = int(os.getenv("RETRIEVAL_CACHE_TTL", 7 * 24 * 3600))
+
+class InProcessStore:
+    """LRU key-value store local to this process."""
+
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, str]" = OrderedDict()
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        return [await self.get(key) for key in keys]
+
+    async def set_many(self, items: Dict[str, str]):
+        for key, value in items.items():
+            await self.set(key, value)
+
+    def size(self) -> int:
+        return len(self.entries)
+
+class RedisStore:
+    """Redis-compatible store shared by all API and worker processes (LRU via maxmemory-policy)."""
+
+    def __init__(self, url: str, ttl: int = RETRIEVAL_CACHE_TTL):
+        # Optional dependency, only needed when RETRIEVAL_CACHE_REDIS_URL is set
+        import redis.asyncio as redis
+        self.client = redis.from_url(url)
+        self.ttl = ttl
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.client.get(key)
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    async def set(self, key: str, value: str):
+        await self.client.set(key, value, ex=self.ttl)
+
+    async def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        # One MGET instead of a round trip per key
+        values = await self.client.mget(keys) if keys else []
+        return [value.decode("utf-8") if isinstance(value, bytes) else value for value in values]
+
+    async def set_many(self, items: Dict[str, str]):
+        if not items:
+            return
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(key, value, ex=self.ttl)
+            await pipe.execute()
+
+    def size(self) -> Optional[int]:
+        return None
+
+class RetrievalCache:
+    """Caches top-k retrieval results per (scope, normalized question, k, corpus version)."""
+
+    def __init__(self, store=None):
+        self.store = store or InProcessStore()
+        self.stats = {"hits": 0, "misses": 0, "errors": 0}
+
+    def _key(self, scope: Union[str, List[str]], question_text: str, k: int, corpus_version: int) -> str:
+        normalized = " ".join(question_text.lower().split())
+        digest = hashlib.sha256(f"{scope_key(scope)}|{normalized}|{k}|{corpus_version}".encode("utf-8")).hexdigest()
+        return f"retrieval:{digest}"
+
+    def _decode(self, raw: Optional[str]) -> Optional[List[Tuple["Document", float]]]:
+        if raw is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        from langchain_core.documents import Document
+        return [(Document(page_content=item["page_content"], metadata=item["metadata"]), item["score"]) for item in json.loads(raw)]
+
+    def _encode(self, docs: List[Tuple["Document", float]]) -> str:
+        return json.dumps([{"page_content": doc.page_content, "metadata": doc.metadata, "score": score} for doc, score in docs], default=str)
+
+    async def get(self, scope: Union[str, List[str]], question_text: str, k: int, corpus_version: Optional[int] = None) -> Optional[List[Tuple["Document", float]]]:
+        if corpus_version is None:
+            corpus_version = await get_corpus_version()
+        try:
+            raw = await self.store.get(self._key(scope, question_text, k, corpus_version))
+        except Exception as e:
+            # A cache outage must never fail retrieval
+            print(f"Retrieval cache read failed: {e}")
+            self.stats["errors"] += 1
+            raw = None
+        return self._decode(raw)
+
+    async def get_many(self, scope: Union[str, List[str]], question_texts: List[str], k: int, corpus_version: Optional[int] = None) -> List[Optional[List[Tuple["Document", float]]]]:
+        """Cached results for many questions in one store round trip (None for misses)."""
+        if corpus_version is None:
+            corpus_version = await get_corpus_version()
+        try:
+            raws = await self.store.get_many([self._key(scope, text, k, corpus_version) for text in question_texts])
+        except Exception as e:
+            print(f"Retrieval cache read failed: {e}")
+            self.stats["errors"] += 1
+            raws = [None] * len(question_texts)
+        return [self._decode(raw) for raw in raws]
+
+    async def set(self, scope: Union[str, List[str]], question_text: str, k: int, docs: List[Tuple["Document", float]], corpus_version: Optional[int] = None):
+        if corpus_version is None:
+            corpus_version = await get_corpus_version()
+        try:
+            await self.store.set(self._key(scope, question_text, k, corpus_version), self._encode(docs))
+        except Exception as e:
+            print(f"Retrieval cache write failed: {e}")
+            self.stats["errors"] += 1
+
+    async def set_many(self, scope: Union[str, List[str]], results: Dict[str, List[Tuple["Document", float]]], k: int, corpus_version: Optional[int] = None):
+        """Store question_text -> docs results in one store round trip."""
+        if corpus_version is None:
+            corpus_version = await get_corpus_version()
+        try:
+            await self.store.set_many({self._key(scope, text, k, corpus_version): self._encode(docs) for text, docs in results.items()})
+        except Exception as e:
+            print(f"Retrieval cache write failed: {e}")
+            self.stats["errors"] += 1
+
+    def get_stats(self) -> Dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            "backend": type(self.store).__name__,
+            "entries": self.store.size(),
+            "evictions": self.store.evictions,
+        }
+
+retrieval_cache = RetrievalCache(RedisStore(RETRIEVAL_CACHE_REDIS_URL) if RETRIEVAL_CACHE_REDIS_URL else InProcessStore())
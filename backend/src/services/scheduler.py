@@ -0,0 +1,193 @@
+import os
+import re
+import time
+import random
+import asyncio
+import contextvars
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Provider quotas. One scheduler per quota pool is shared by every caller in the process.
+LLM_RPM = int(os.getenv("LLM_RPM", 60))
+LLM_TPM = int(os.getenv("LLM_TPM", 250000))
+EMBED_RPM = int(os.getenv("EMBED_RPM", 100))
+EMBED_TPM = int(os.getenv("EMBED_TPM", 30000))
+SCHEDULER_MAX_RETRIES = int(os.getenv("SCHEDULER_MAX_RETRIES", 5))
+# Pause applied to all callers on a 429 that carries no Retry-After hint
+SCHEDULER_DEFAULT_PAUSE = float(os.getenv("SCHEDULER_DEFAULT_PAUSE", 30))
+
+# Set by interactive request paths (single answers); their calls are admitted ahead of bulk work
+interactive_call = contextvars.ContextVar("interactive_call", default=False)
+
+TRANSIENT_STATUS_CODES = (500, 502, 503, 504)
+# Fallback for errors that only carry a message; word boundaries keep "1500 tokens" from matching "500"
+TRANSIENT_PATTERN = re.compile(r"\b(?:500|502|503|504|UNAVAILABLE|DEADLINE_EXCEEDED|INTERNAL)\b|timed out|Timeout|Connection reset")
+RATE_LIMIT_PATTERN = re.compile(r"\b429\b|RESOURCE_EXHAUSTED")
+TRANSIENT_TYPES = ("TimeoutError", "ConnectError", "ReadTimeout", "ConnectTimeout", "RemoteProtocolError", "ServiceUnavailable")
+
+def status_code(exception: BaseException) -> Optional[int]:
+    """HTTP status carried by the exception (google-genai/api_core `code`, httpx `response.status_code`)."""
+    for value in (getattr(exception, "code", None), getattr(exception, "status_code", None), getattr(getattr(exception, "response", None), "status_code", None)):
+        if isinstance(value, int) and 100 <= value < 600:
+            return value
+    return None
+
+def is_rate_limit_error(exception: BaseException) -> bool:
+    code = status_code(exception)
+    if code is not None:
+        return code == 429
+    return bool(RATE_LIMIT_PATTERN.search(str(exception)))
+
+def is_transient_error(exception: BaseException) -> bool:
+    """Server-side or network failures worth retrying; bad requests and auth errors are not."""
+    if type(exception).__name__ in TRANSIENT_TYPES or isinstance(exception, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    code = status_code(exception)
+    if code is not None:
+        return code in TRANSIENT_STATUS_CODES
+    return bool(TRANSIENT_PATTERN.search(str(exception)))
+
+def retry_after_seconds(exception: BaseException) -> Optional[float]:
+    """Read the provider's back-off hint from a Retry-After header or a retryDelay field."""
+    response = getattr(exception, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers and headers.get("Retry-After"):
+        try:
+            return float(headers["Retry-After"])
+        except ValueError:
+            pass
+    match = re.search(r"retry(?:Delay|[ _-]after| in)['\"]?\s*[:=]?\s*['\"]?(\d+(?:\.\d+)?)\s*s", str(exception), re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+class TokenBucket:
+    def __init__(self, per_minute: int):
+        self.capacity = float(max(1, per_minute))
+        self.rate = self.capacity / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        # Requests larger than the bucket are clamped so they can still run (alone)
+        amount = min(float(amount), self.capacity)
+        async with self.lock:
+            self._refill()
+            while self.available < amount:
+                await asyncio.sleep((amount - self.available) / self.rate)
+                self._refill()
+            self.available -= amount
+
+class QuotaScheduler:
+    """Token-bucket admission plus a shared circuit breaker for one provider quota.
+
+    Every call goes through run(), which waits for request and token budget, pauses
+    while the breaker is open and retries only rate-limit and transient errors. The
+    callable is provider-agnostic, so a fake async function is enough to exercise it
+    offline.
+    """
+
+    def __init__(self, name: str, rpm: int, tpm: int, max_retries: int = SCHEDULER_MAX_RETRIES):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.open_until = 0.0
+        self.queue_depth = 0
+        self.interactive_waiting = 0
+        self.in_flight = 0
+        self.stats = {"calls": 0, "succeeded": 0, "failed": 0, "retries": 0, "rate_limited": 0, "circuit_trips": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+    async def _wait_for_circuit(self):
+        while True:
+            remaining = self.open_until - time.monotonic()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(remaining)
+
+    def trip(self, seconds: float):
+        """Open the breaker: every caller of this scheduler pauses until it closes."""
+        until = time.monotonic() + seconds
+        if until > self.open_until:
+            self.open_until = until
+            self.stats["circuit_trips"] += 1
+            print(f"[{self.name}] quota exhausted, pausing all calls for {seconds:.1f}s")
+
+    async def acquire(self, tokens: int = 1):
+        """Wait for the breaker and the request/token budget before one provider call."""
+        interactive = interactive_call.get()
+        self.queue_depth += 1
+        if interactive:
+            self.interactive_waiting += 1
+        started = time.monotonic()
+        try:
+            await self._wait_for_circuit()
+            # Bulk callers step aside while an interactive call waits for budget
+            while not interactive and self.interactive_waiting:
+                await asyncio.sleep(0.05)
+            await self.requests.acquire(1)
+            await self.tokens.acquire(tokens)
+            # The breaker may have opened while we waited for budget
+            await self._wait_for_circuit()
+        finally:
+            self.queue_depth -= 1
+            if interactive:
+                self.interactive_waiting -= 1
+        waited = time.monotonic() - started
+        self.stats["total_wait_seconds"] += waited
+        self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], waited)
+
+    def record_error(self, exception: BaseException, attempt: int = 0) -> Optional[float]:
+        """Classify a failed call. Returns the delay before a retry, or None if it must not be retried."""
+        if is_rate_limit_error(exception):
+            self.stats["rate_limited"] += 1
+            pause = retry_after_seconds(exception) or SCHEDULER_DEFAULT_PAUSE
+            self.trip(pause)
+            return 0.0
+        if is_transient_error(exception):
+            return min(60.0, 2 ** attempt + random.random())
+        return None
+
+    async def run(self, fn: Callable[[], Awaitable[T]], tokens: int = 1) -> T:
+        self.stats["calls"] += 1
+        attempt = 0
+        while True:
+            await self.acquire(tokens)
+            self.in_flight += 1
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = self.record_error(e, attempt)
+                if delay is None or attempt >= self.max_retries:
+                    self.stats["failed"] += 1
+                    raise
+                attempt += 1
+                self.stats["retries"] += 1
+                if delay:
+                    await asyncio.sleep(delay)
+                continue
+            finally:
+                self.in_flight -= 1
+            self.stats["succeeded"] += 1
+            return result
+
+    def get_stats(self) -> Dict:
+        admitted = self.stats["calls"] + self.stats["retries"]
+        return {
+            **self.stats,
+            "queue_depth": self.queue_depth,
+            "interactive_waiting": self.interactive_waiting,
+            "in_flight": self.in_flight,
+            "avg_wait_seconds": self.stats["total_wait_seconds"] / admitted if admitted else 0.0,
+            "circuit_open_seconds": max(0.0, self.open_until - time.monotonic()),
+            "rpm": self.requests.capacity,
+            "tpm": self.tokens.capacity,
+        }
+
+llm_scheduler = QuotaScheduler("llm", LLM_RPM, LLM_TPM)
+embedding_scheduler = QuotaScheduler("embedding", EMBED_RPM, EMBED_TPM)
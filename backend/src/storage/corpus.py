@@ -0,0 +1,25 @@
+from pymongo import ReturnDocument
+from .db import storage
+
+# The corpus version changes whenever a document is (re)indexed. Anything derived from
+# retrieval (reused answers, cached search results) is only valid for the version it saw.
+CORPUS_META_ID = "corpus"
+
+async def get_corpus_version() -> int:
+    db = storage.get_db()
+    if db is None:
+        return 0
+    meta = await db.corpus_meta.find_one({"_id": CORPUS_META_ID})
+    return meta.get("version", 0) if meta else 0
+
+async def bump_corpus_version() -> int:
+    db = storage.get_db()
+    if db is None:
+        return 0
+    meta = await db.corpus_meta.find_one_and_update(
+        {"_id": CORPUS_META_ID},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return meta["version"]
@@ -1,6 +1,7 @@
 import os
+import httpx
 from motor.motor_asyncio import AsyncIOMotorClient
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,6 +9,9 @@ load_dotenv()
 MONGO_URI = os.getenv("MONGO_URI")
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", 30))
+QDRANT_MAX_CONNECTIONS = int(os.getenv("QDRANT_MAX_CONNECTIONS", 50))
+QDRANT_MAX_KEEPALIVE = int(os.getenv("QDRANT_MAX_KEEPALIVE", 20))
 
 class Storage:
     def __init__(self):
@@ -28,9 +32,12 @@ class Storage:
         if not QDRANT_URL:
             print("WARNING: QDRANT_URL not found in environment")
         else:
-            self.qdrant_client = QdrantClient(
-                url=QDRANT_URL, 
-                api_key=QDRANT_API_KEY
+            # Async client with a pooled HTTP connection set, shared by all handlers and tasks
+            self.qdrant_client = AsyncQdrantClient(
+                url=QDRANT_URL,
+                api_key=QDRANT_API_KEY,
+                timeout=QDRANT_TIMEOUT,
+                limits=httpx.Limits(max_connections=QDRANT_MAX_CONNECTIONS, max_keepalive_connections=QDRANT_MAX_KEEPALIVE)
             )
             print("Successfully connected to Qdrant")
 
@@ -38,6 +45,9 @@ class Storage:
         if self.mongo_client:
             self.mongo_client.close()
             print("Disconnected from MongoDB")
+        if self.qdrant_client:
+            await self.qdrant_client.close()
+            print("Disconnected from Qdrant")
 
     def get_db(self):
         return self.db
@@ -57,7 +67,7 @@ class Storage:
         try:
             if self.qdrant_client:
                 # Simple check for qdrant
-                self.qdrant_client.get_collections()
+                await self.qdrant_client.get_collections()
                 health["qdrant"] = "online"
         except Exception as e:
             health["qdrant"] = f"error: {str(e)}"
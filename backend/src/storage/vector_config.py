@@ -0,0 +1,103 @@
+import os
+import math
+import hashlib
+from typing import List, Optional, Union
+from qdrant_client import models
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Every document lives in one shared collection; project scopes are payload filters on it
+QDRANT_COLLECTION = os.getenv("QDRANT_COLLECTION", "ALL_DOCS")
+ALL_DOCS_SCOPE = "ALL_DOCS"
+
+# Keyword payload indexes that back scope filtering
+SCOPE_PAYLOAD_FIELDS = ["metadata.document_name", "metadata.document_id"]
+
+# gemini-embedding-001 is Matryoshka-trained: its vectors can be truncated to 1536 or 768 dims
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", 3072))
+
+# Collection storage settings (applied when a collection is created)
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none").lower()  # none | scalar | binary
+QDRANT_ON_DISK = os.getenv("QDRANT_ON_DISK", "false").lower() == "true"
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", 16))
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", 100))
+QDRANT_HNSW_ON_DISK = os.getenv("QDRANT_HNSW_ON_DISK", "false").lower() == "true"
+
+# Search settings
+QDRANT_SEARCH_EF = int(os.getenv("QDRANT_SEARCH_EF", 128))
+QDRANT_OVERSAMPLING = float(os.getenv("QDRANT_OVERSAMPLING", 2.0))
+
+def truncate_vector(vector: List[float], dim: int) -> List[float]:
+    """Matryoshka truncation: keep the leading dims and re-normalize."""
+    if dim >= len(vector):
+        return vector
+    head = vector[:dim]
+    norm = math.sqrt(sum(x * x for x in head)) or 1.0
+    return [x / norm for x in head]
+
+def quantization_config(mode: str = QDRANT_QUANTIZATION) -> Optional[models.QuantizationConfig]:
+    # Quantized vectors stay in RAM for the first pass; originals can live on disk for rescoring
+    if mode == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if mode == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    if mode not in ("none", ""):
+        raise ValueError(f"Unknown QDRANT_QUANTIZATION mode: {mode}")
+    return None
+
+def vectors_config(dim: int = EMBEDDING_DIM, on_disk: bool = QDRANT_ON_DISK) -> models.VectorParams:
+    return models.VectorParams(size=dim, distance=models.Distance.COSINE, on_disk=on_disk)
+
+def hnsw_config(m: int = QDRANT_HNSW_M, ef_construct: int = QDRANT_HNSW_EF_CONSTRUCT, on_disk: bool = QDRANT_HNSW_ON_DISK) -> models.HnswConfigDiff:
+    return models.HnswConfigDiff(m=m, ef_construct=ef_construct, on_disk=on_disk)
+
+def collection_settings(dim: int = EMBEDDING_DIM, quantization: str = QDRANT_QUANTIZATION, on_disk: bool = QDRANT_ON_DISK) -> dict:
+    """Keyword arguments for QdrantClient.create_collection."""
+    return {
+        "vectors_config": vectors_config(dim, on_disk),
+        "hnsw_config": hnsw_config(),
+        "quantization_config": quantization_config(quantization),
+    }
+
+def search_params(quantization: str = QDRANT_QUANTIZATION, oversampling: float = QDRANT_OVERSAMPLING) -> models.SearchParams:
+    # With quantization, fetch extra candidates from the compressed index and rescore
+    # them against the full-precision vectors so recall@k stays close to float32.
+    quantization_params = None
+    if quantization in ("scalar", "binary"):
+        quantization_params = models.QuantizationSearchParams(rescore=True, oversampling=oversampling)
+    return models.SearchParams(hnsw_ef=QDRANT_SEARCH_EF, quantization=quantization_params)
+
+def document_id(doc_name: str) -> str:
+    return "doc_" + hashlib.sha256(doc_name.encode("utf-8")).hexdigest()[:16]
+
+def normalize_scope(scope: Union[str, List[str], None]) -> Optional[List[str]]:
+    """Documents a scope is restricted to, or None for ALL_DOCS. An empty list stays empty."""
+    if scope is None or scope == "" or scope == ALL_DOCS_SCOPE:
+        return None
+    if isinstance(scope, str):
+        # Legacy scopes were a single collection/document name
+        return [scope]
+    return list(scope)
+
+def scope_key(scope: Union[str, List[str], None]) -> str:
+    """Canonical string for a scope, independent of document order."""
+    documents = normalize_scope(scope)
+    if documents is None:
+        return ALL_DOCS_SCOPE
+    return "docs:" + ",".join(sorted(set(documents)))
+
+def scope_filter(scope: Union[str, List[str], None]) -> Optional[models.Filter]:
+    # Scope entries may be document names or document IDs
+    documents = normalize_scope(scope)
+    if documents is None:
+        return None
+    if not documents:
+        # Scoped to no documents: match nothing rather than the whole corpus
+        return models.Filter(must=[models.FieldCondition(key="metadata.document_id", match=models.MatchValue(value=""))])
+    return models.Filter(should=[
+        models.FieldCondition(key="metadata.document_name", match=models.MatchAny(any=documents)),
+        models.FieldCondition(key="metadata.document_id", match=models.MatchAny(any=documents)),
+    ])
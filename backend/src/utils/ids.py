@@ -0,0 +1,51 @@
+import os
+import re
+import time
+import threading
+
+# ULID layout: 48-bit millisecond timestamp + 80 random bits, Crockford base32 (26 chars).
+# IDs sort by creation time, so they stay append-friendly in B-tree indexes.
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_RANDOM_BITS = 80
+
+# IDs issued before this scheme: prefix (+ job type) + second-resolution timestamp, not unique
+LEGACY_ID_PATTERN = re.compile(r"^(?:ans|proj|job)_(?:[A-Z_]+_)?\d{14}$")
+
+_lock = threading.Lock()
+_last_ms = -1
+_last_random = 0
+_pid = os.getpid()
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+def new_ulid() -> str:
+    """Monotonic ULID: within one millisecond the random part is incremented, so IDs from
+    this process never go backwards; the random bits keep IDs from other processes distinct."""
+    global _last_ms, _last_random, _pid
+    with _lock:
+        if os.getpid() != _pid:
+            # Forked child: don't continue the parent's sequence
+            _pid, _last_ms = os.getpid(), -1
+        now_ms = int(time.time() * 1000)
+        if now_ms <= _last_ms:
+            # Same millisecond (or the clock stepped back): keep ordering by incrementing
+            now_ms = _last_ms
+            _last_random += 1
+            if _last_random >= 1 << _RANDOM_BITS:
+                now_ms += 1
+                _last_random = int.from_bytes(os.urandom(10), "big")
+        else:
+            _last_random = int.from_bytes(os.urandom(10), "big")
+        _last_ms = now_ms
+        return _encode(now_ms, 10) + _encode(_last_random, 16)
+
+def new_id(prefix: str) -> str:
+    return f"{prefix}_{new_ulid()}"
+
+def is_legacy_id(value: str) -> bool:
+    return bool(LEGACY_ID_PATTERN.match(value or ""))
@@ -0,0 +1,60 @@
+import os
+import time
+import threading
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Warn when importing the app takes longer than this (autoscaled pods pay it on every cold start)
+STARTUP_IMPORT_BUDGET_SECONDS = float(os.getenv("STARTUP_IMPORT_BUDGET_SECONDS", 2.0))
+
+_timings: Dict[str, float] = {}
+_services: Dict[str, "LazyService"] = {}
+
+def record_timing(name: str, seconds: float):
+    _timings[name] = seconds
+
+class LazyService(Generic[T]):
+    """Stand-in for a module-level service singleton that builds it on first use.
+
+    Attribute access is forwarded to the real instance, so callers keep using
+    `generation_service.generate_answer(...)` unchanged. The factory (and any heavy
+    imports inside it) only runs when the service is actually needed.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self._name = name
+        self._factory = factory
+        self._instance: Optional[T] = None
+        self._init_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+        _services[name] = self
+
+    def get(self) -> T:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    started = time.perf_counter()
+                    self._instance = self._factory()
+                    self._init_seconds = time.perf_counter() - started
+                    print(f"Initialized {self._name} in {self._init_seconds:.2f}s")
+        return self._instance
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.get(), attr)
+
+def startup_report() -> Dict:
+    imports = _timings.get("imports")
+    return {
+        "timings": dict(_timings),
+        "import_budget_seconds": STARTUP_IMPORT_BUDGET_SECONDS,
+        "within_budget": imports is None or imports <= STARTUP_IMPORT_BUDGET_SECONDS,
+        "services": {
+            name: {"initialized": service.initialized, "init_seconds": service._init_seconds}
+            for name, service in _services.items()
+        },
+    }
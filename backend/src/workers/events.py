@@ -0,0 +1,75 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Set
+from ..storage.db import storage
+
+# "local": events are published by the JobManager of this process (API with inline worker).
+# "mongo": events come from a change stream on the jobs collection, so updates written by
+# any worker or API process reach every subscriber. Requires a replica set.
+JOB_EVENTS_BACKEND = os.getenv("JOB_EVENTS_BACKEND", "local").lower()
+JOB_EVENTS_QUEUE_SIZE = int(os.getenv("JOB_EVENTS_QUEUE_SIZE", 1000))
+
+class LocalJobEvents:
+    """In-process pub/sub for job state changes."""
+
+    def __init__(self):
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    def _dispatch(self, job: Dict):
+        for queue in list(self._subscribers):
+            if queue.full():
+                # A slow subscriber loses its oldest event rather than blocking publishers
+                queue.get_nowait()
+            queue.put_nowait(job)
+
+    def publish(self, job: Dict):
+        self._dispatch(job)
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue]:
+        queue = asyncio.Queue(maxsize=JOB_EVENTS_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+
+class MongoJobEvents(LocalJobEvents):
+    """Fans a change stream on the jobs collection out to local subscribers."""
+
+    def __init__(self):
+        super().__init__()
+        self._watcher = None
+        self._resume_token = None
+
+    def publish(self, job: Dict):
+        # The change stream delivers every write, including this process's own
+        pass
+
+    async def _watch(self):
+        while True:
+            db = storage.get_db()
+            if db is None:
+                await asyncio.sleep(1)
+                continue
+            try:
+                async with db.jobs.watch(full_document="updateLookup", resume_after=self._resume_token) as stream:
+                    async for change in stream:
+                        self._resume_token = stream.resume_token
+                        job = change.get("fullDocument")
+                        if job:
+                            job.pop("_id", None)
+                            self._dispatch(job)
+            except Exception as e:
+                print(f"Job change stream interrupted, reconnecting: {e}")
+                await asyncio.sleep(1)
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue]:
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.create_task(self._watch())
+        async with super().subscribe() as queue:
+            yield queue
+
+job_events = MongoJobEvents() if JOB_EVENTS_BACKEND == "mongo" else LocalJobEvents()
@@ -1,11 +1,126 @@
-from datetime import datetime
-from typing import Dict, Optional, Any
+import os
+import time
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any
+from pymongo import ASCENDING, ReturnDocument
 from ..models.models import RequestStatus, JobStatus, RequestStatusType
 from ..storage.db import storage
+from .events import job_events
+from ..utils.ids import new_id
+
+# A claimed job belongs to its worker until the lease runs out; heartbeats extend it
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 60))
+# Attempts before a job whose worker keeps dying is failed instead of requeued
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+# Progress/message updates are coalesced and written at most this often per job;
+# status changes, errors and results are written immediately
+JOB_PROGRESS_FLUSH_MS = int(os.getenv("JOB_PROGRESS_FLUSH_MS", 1000))
+# How often a running task re-reads its cancel flag from Mongo
+JOB_CANCEL_CHECK_SECONDS = float(os.getenv("JOB_CANCEL_CHECK_SECONDS", 1.0))
+
+FINISHED_JOB_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+# Priority lanes: interactive single answers, then bulk generation, then indexing
+TASK_LANES = {
+    "generate_single_answer": "interactive",
+    "generate_answers": "generation",
+    "create_project": "generation",
+    "index_document": "indexing",
+    "index_documents_bulk": "indexing",
+}
+LANE_PRIORITY = {"interactive": 0, "generation": 1, "indexing": 2}
+# Tasks that check should_cancel while running; any queued job can be cancelled
+CANCELLABLE_TASKS = ["create_project", "generate_answers"]
+
+def task_lane(task: str) -> str:
+    return TASK_LANES.get(task, "generation")
 
 class JobManager:
+    def __init__(self):
+        # job_id -> {"doc": latest known job document, "pending": unwritten fields, "last_flush": monotonic, "lock", "timer",
+        #            "worker_id"/"attempts": the claim our writes are fenced on, "task": the asyncio task running the job}
+        self._local: Dict[str, Dict] = {}
+        # Jobs this process no longer owns (lease lost or abandoned): their late writes are dropped
+        self._lost = set()
+        self.stats = {"updates": 0, "writes": 0, "coalesced": 0, "local_reads": 0, "leases_lost": 0}
+
+    def _track(self, doc: Dict):
+        self._lost.discard(doc["job_id"])
+        self._local[doc["job_id"]] = {
+            "doc": doc, "pending": {}, "last_flush": time.monotonic(), "lock": asyncio.Lock(), "timer": None, "cancel_checked": time.monotonic(),
+            "worker_id": doc.get("worker_id"), "attempts": doc.get("attempts"), "task": None
+        }
+
+    def _write_filter(self, job_id: str, state: Dict) -> Dict:
+        # A claimed job is only written while this claim still holds: once the lease is requeued,
+        # the new claim has another worker_id or attempt number and our writes match nothing
+        if state["worker_id"] is None:
+            return {"job_id": job_id}
+        return {"job_id": job_id, "worker_id": state["worker_id"], "attempts": state["attempts"]}
+
+    def bind(self, job_id: str, task: asyncio.Task):
+        """Register the task running a claimed job, so it can be stopped if the lease is lost."""
+        state = self._local.get(job_id)
+        if state is not None:
+            state["task"] = task
+
+    def _lease_lost(self, job_id: str):
+        print(f"Lease on job {job_id} lost; dropping its pending updates and stopping it")
+        self.stats["leases_lost"] += 1
+        state = self._local.get(job_id)
+        self.forget(job_id)
+        task = state.get("task") if state else None
+        if task is not None and not task.done():
+            task.cancel()
+
+    async def flush(self, job_id: str):
+        """Write a job's coalesced updates to Mongo now."""
+        state = self._local.get(job_id)
+        if state is None:
+            return
+        async with state["lock"]:
+            pending, state["pending"] = state["pending"], {}
+            state["last_flush"] = time.monotonic()
+            if not pending:
+                return
+            db = storage.get_db()
+            if db is None:
+                return
+            self.stats["writes"] += 1
+            result = await db.jobs.update_one(self._write_filter(job_id, state), {"$set": pending})
+            if result.matched_count == 0 and state["worker_id"] is not None:
+                self._lease_lost(job_id)
+                return
+        if pending.get("status") in FINISHED_JOB_STATUSES:
+            # Final state is in Mongo; stop tracking the job locally
+            self._local.pop(job_id, None)
+
+    def forget(self, job_id: str):
+        # Drop local state without writing it (the job now belongs to another worker)
+        self._lost.add(job_id)
+        state = self._local.pop(job_id, None)
+        if state is not None and state["timer"] is not None:
+            state["timer"].cancel()
+
+    async def _flush_later(self, job_id: str, delay: float):
+        await asyncio.sleep(delay)
+        state = self._local.get(job_id)
+        if state is not None:
+            state["timer"] = None
+            await self.flush(job_id)
+
+    async def ensure_indexes(self):
+        db = storage.get_db()
+        if db is None:
+            return
+        await db.jobs.create_index("job_id")
+        await db.jobs.create_index([("status", ASCENDING), ("created_at", ASCENDING)])
+        await db.jobs.create_index([("status", ASCENDING), ("priority", ASCENDING), ("created_at", ASCENDING)])
+        await db.jobs.create_index([("status", ASCENDING), ("lease_until", ASCENDING)])
+
     async def create_job(self, job_type: RequestStatusType, message: str = "Job started") -> str:
-        job_id = f"job_{job_type.value}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        job_id = new_id("job")
         status = RequestStatus(
             job_id=job_id,
             type=job_type,
@@ -17,14 +132,153 @@ class JobManager:
         # FIX 1: Change "if db:" to "if db is not None:"
         if db is not None:
             await db.jobs.insert_one(status.dict())
+        # Inline jobs are updated by this process, so their state is kept locally
+        self._track(status.dict())
+        job_events.publish(status.dict())
+        return job_id
+
+    async def enqueue(self, job_type: RequestStatusType, task: str, args: Dict, message: str = "Job queued") -> str:
+        """Persist a PENDING job for a worker to claim. `args` are the task's keyword arguments."""
+        job_id = new_id("job")
+        status = RequestStatus(
+            job_id=job_id,
+            type=job_type,
+            status=JobStatus.PENDING,
+            message=message,
+            task=task,
+            args=args,
+            priority=LANE_PRIORITY[task_lane(task)]
+        )
+        db = storage.get_db()
+        if db is None:
+            raise Exception("MongoDB not initialized")
+        await db.jobs.insert_one(status.dict())
+        job_events.publish(status.dict())
         return job_id
 
+    async def claim(self, worker_id: str, lease_seconds: int = JOB_LEASE_SECONDS, exclude_tasks: Optional[List[str]] = None) -> Optional[Dict]:
+        """Atomically take the highest-priority, oldest PENDING job, or None if there is none.
+
+        exclude_tasks skips task types the worker has no capacity for right now.
+        """
+        db = storage.get_db()
+        if db is None:
+            return None
+        now = datetime.utcnow()
+        task_filter = {"$ne": None, "$nin": exclude_tasks} if exclude_tasks else {"$ne": None}
+        job = await db.jobs.find_one_and_update(
+            {"status": JobStatus.PENDING, "task": task_filter},
+            {
+                "$set": {"status": JobStatus.RUNNING, "worker_id": worker_id, "lease_until": now + timedelta(seconds=lease_seconds), "updated_at": now},
+                "$inc": {"attempts": 1}
+            },
+            sort=[("priority", ASCENDING), ("created_at", ASCENDING)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        if job is not None:
+            self._track(dict(job))
+            job_events.publish(dict(job))
+        return job
+
+    async def heartbeat(self, job_id: str, worker_id: str, lease_seconds: int = JOB_LEASE_SECONDS) -> bool:
+        """Extend the lease. False means the job is no longer ours (requeued or finished)."""
+        db = storage.get_db()
+        if db is None:
+            return False
+        result = await db.jobs.update_one(
+            {"job_id": job_id, "worker_id": worker_id, "status": JobStatus.RUNNING},
+            {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=lease_seconds)}}
+        )
+        return result.matched_count > 0
+
+    async def release(self, job_id: str, worker_id: str):
+        # Finished jobs drop their lease; a task that returned without a final status is completed
+        state = self._local.get(job_id)
+        claim = self._write_filter(job_id, state) if state else {"job_id": job_id, "worker_id": worker_id}
+        await self.flush(job_id)
+        self._local.pop(job_id, None)
+        db = storage.get_db()
+        if db is None or job_id in self._lost:
+            return
+        completed = {"status": JobStatus.COMPLETED, "progress": 1.0, "updated_at": datetime.utcnow()}
+        result = await db.jobs.update_one({**claim, "status": JobStatus.RUNNING}, {"$set": completed})
+        if result.modified_count:
+            job_events.publish({"job_id": job_id, **completed})
+        await db.jobs.update_one(claim, {"$set": {"lease_until": None}})
+
+    async def requeue_expired(self) -> int:
+        """Return jobs whose worker stopped heartbeating to the queue (or fail them after JOB_MAX_ATTEMPTS)."""
+        db = storage.get_db()
+        if db is None:
+            return 0
+        now = datetime.utcnow()
+        expired = {"status": JobStatus.RUNNING, "lease_until": {"$ne": None, "$lt": now}}
+        await db.jobs.update_many(
+            {**expired, "attempts": {"$gte": JOB_MAX_ATTEMPTS}},
+            {"$set": {"status": JobStatus.FAILED, "error": f"Worker lost {JOB_MAX_ATTEMPTS} times", "lease_until": None, "updated_at": now}}
+        )
+        result = await db.jobs.update_many(
+            expired,
+            {"$set": {"status": JobStatus.PENDING, "worker_id": None, "lease_until": None, "message": "Requeued after worker lease expired", "updated_at": now}}
+        )
+        return result.modified_count
+
+    async def cancel(self, job_id: str) -> Optional[JobStatus]:
+        """Cancel a queued job now, or ask a running one to stop at its next checkpoint.
+
+        Returns the job's status afterwards (CANCELLED or RUNNING), or None if it had already
+        finished or is running a task that can't be interrupted.
+        """
+        db = storage.get_db()
+        if db is None:
+            return None
+        now = datetime.utcnow()
+        cancelled = {"status": JobStatus.CANCELLED, "message": "Cancelled before it started", "updated_at": now}
+        result = await db.jobs.update_one({"job_id": job_id, "status": JobStatus.PENDING}, {"$set": cancelled})
+        if result.modified_count:
+            job_events.publish({"job_id": job_id, **cancelled})
+            return JobStatus.CANCELLED
+
+        requested = {"cancel_requested": True, "message": "Cancelling...", "updated_at": now}
+        result = await db.jobs.update_one({"job_id": job_id, "status": JobStatus.RUNNING, "task": {"$in": CANCELLABLE_TASKS}}, {"$set": requested})
+        if not result.modified_count:
+            return None
+        state = self._local.get(job_id)
+        if state is not None:
+            # Running here: the task sees the flag at its next checkpoint without a read
+            state["doc"].update(requested)
+            job_events.publish(dict(state["doc"]))
+        else:
+            job_events.publish({"job_id": job_id, **requested})
+        return JobStatus.RUNNING
+
+    async def should_cancel(self, job_id: str) -> bool:
+        """Checkpoint for long tasks: True once cancellation was requested."""
+        state = self._local.get(job_id)
+        if state is None:
+            return False
+        if state["doc"].get("cancel_requested"):
+            return True
+        # The request may have landed on another API node: re-read the flag at most once per interval
+        if time.monotonic() - state["cancel_checked"] < JOB_CANCEL_CHECK_SECONDS:
+            return False
+        state["cancel_checked"] = time.monotonic()
+        db = storage.get_db()
+        if db is None:
+            return False
+        job = await db.jobs.find_one({"job_id": job_id}, {"_id": 0, "cancel_requested": 1})
+        state["doc"]["cancel_requested"] = bool(job and job.get("cancel_requested"))
+        return state["doc"]["cancel_requested"]
+
     async def update_job(self, job_id: str, status: Optional[JobStatus] = None, progress: Optional[float] = None, message: Optional[str] = None, error: Optional[str] = None, result: Optional[Any] = None):
         db = storage.get_db()
         
         # FIX 2: Change "if not db:" to "if db is None:"
         if db is None: 
             return
+        if job_id in self._lost:
+            return
         
         update_data = {"updated_at": datetime.utcnow()}
         if status: update_data["status"] = status
@@ -32,10 +286,40 @@ class JobManager:
         if message: update_data["message"] = message
         if error: update_data["error"] = error
         if result: update_data["result"] = result
-        
-        await db.jobs.update_one({"job_id": job_id}, {"$set": update_data})
+        self.stats["updates"] += 1
+
+        state = self._local.get(job_id)
+        if state is None:
+            # Not a job this process runs: write through
+            self.stats["writes"] += 1
+            await db.jobs.update_one({"job_id": job_id}, {"$set": update_data})
+            job_events.publish({"job_id": job_id, **update_data})
+            return
+
+        # Subscribers see every update right away; only the Mongo writes are coalesced
+        state["doc"].update(update_data)
+        job_events.publish(dict(state["doc"]))
+        state["pending"].update(update_data)
+        if status or error or result:
+            await self.flush(job_id)
+            return
+
+        wait = JOB_PROGRESS_FLUSH_MS / 1000 - (time.monotonic() - state["last_flush"])
+        if wait <= 0:
+            await self.flush(job_id)
+        else:
+            # Coalesced: the latest progress is written when the window closes
+            self.stats["coalesced"] += 1
+            if state["timer"] is None:
+                state["timer"] = asyncio.create_task(self._flush_later(job_id, wait))
 
     async def get_job(self, job_id: str) -> Optional[Dict]:
+        # Jobs run by this process are served from local state, which is never older than Mongo
+        state = self._local.get(job_id)
+        if state is not None:
+            self.stats["local_reads"] += 1
+            return dict(state["doc"])
+
         db = storage.get_db()
         
         # FIX 3: Change "if not db:" to "if db is None:"
@@ -44,4 +328,25 @@ class JobManager:
             
         return await db.jobs.find_one({"job_id": job_id}, {"_id": 0})
 
-job_manager = JobManager()
\ No newline at end of file
+    async def list_jobs(self, since: Optional[datetime] = None, limit: int = 50) -> List[Dict]:
+        """Active jobs, plus any job updated after `since` (to catch up a reconnecting client)."""
+        db = storage.get_db()
+        if db is None:
+            return []
+        query = {"status": {"$in": [JobStatus.RUNNING, JobStatus.PENDING]}}
+        if since is not None:
+            query = {"$or": [query, {"updated_at": {"$gt": since}}]}
+        jobs = await db.jobs.find(query, {"_id": 0}).sort("created_at", -1).to_list(limit)
+        # Locally tracked jobs may have progress that hasn't been flushed yet
+        return [dict(self._local[job["job_id"]]["doc"]) if job["job_id"] in self._local else job for job in jobs]
+
+    def get_stats(self) -> Dict:
+        updates = self.stats["updates"]
+        return {
+            **self.stats,
+            "tracked_jobs": len(self._local),
+            "flush_interval_ms": JOB_PROGRESS_FLUSH_MS,
+            "writes_per_update": self.stats["writes"] / updates if updates else 0.0,
+        }
+
+job_manager = JobManager()
@@ -0,0 +1,17 @@
+from typing import Awaitable, Callable, Dict
+from .tasks import (
+    index_document_async_task,
+    index_documents_bulk_task,
+    create_project_async_task,
+    generate_answers_for_project,
+    generate_single_answer_task,
+)
+
+# Task names stored on queued jobs. Every task takes the job_id first, then its keyword arguments.
+TASKS: Dict[str, Callable[..., Awaitable]] = {
+    "index_document": index_document_async_task,
+    "index_documents_bulk": index_documents_bulk_task,
+    "create_project": create_project_async_task,
+    "generate_answers": generate_answers_for_project,
+    "generate_single_answer": generate_single_answer_task,
+}
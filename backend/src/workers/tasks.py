@@ -1,13 +1,31 @@
 import os
+import asyncio
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, Tuple, Union
+from pymongo import ReplaceOne
 from ..storage.db import storage
-from ..models.models import ProjectStatus, JobStatus, Project
+from ..models.models import ProjectStatus, JobStatus, AnswerStatus, Project, Answer
 from ..indexing.pipeline import indexing_pipeline
+from ..storage.vector_config import document_id
+from ..storage.corpus import get_corpus_version, bump_corpus_version
 from ..services.generation import generation_service
 from ..services.parser import questionnaire_parser
+from ..services.answer_reuse import answer_reuse_service
+from ..services.scheduler import interactive_call
 from ..workers.manager import job_manager
 
+# Files indexed at once by a bulk ingestion job
+INDEX_BULK_CONCURRENCY = int(os.getenv("INDEX_BULK_CONCURRENCY", 3))
+# Upper bound for a request's own concurrency: each file brings its own embed batches and PDF pool work
+INDEX_BULK_MAX_CONCURRENCY = int(os.getenv("INDEX_BULK_MAX_CONCURRENCY", 8))
+# Questions generated at once per project
+GENERATION_CONCURRENCY = int(os.getenv("GENERATION_CONCURRENCY", 4))
+# Questions answered per LLM call in batched generation mode (1 disables batching)
+GENERATION_BATCH_SIZE = int(os.getenv("GENERATION_BATCH_SIZE", 1))
+
+# Reviewer-owned answers are never replaced by regeneration
+PROTECTED_ANSWER_STATUSES = [AnswerStatus.CONFIRMED, AnswerStatus.MANUAL_UPDATED]
+
 def format_api_error(e: Exception) -> str:
     error_msg = str(e)
     if "RESOURCE_EXHAUSTED" in error_msg:
@@ -16,35 +34,103 @@ def format_api_error(e: Exception) -> str:
         return "Rate limit exceeded. slowing down..."
     return error_msg
 
-async def index_document_async_task(job_id: str, file_path: str, doc_name: str):
-    try:
-        await job_manager.update_job(job_id, status=JobStatus.RUNNING, message="Chunking and indexing...")
-        chunks_count = await indexing_pipeline.index_document(file_path, doc_name)
-        
-        # Mark ALL_DOCS projects as OUTDATED
-        db = storage.get_db()
+async def index_file(file_path: str, doc_name: str, progress_callback=None) -> int:
+    chunks_count = await indexing_pipeline.index_document(file_path, doc_name, progress_callback=progress_callback)
 
-        # Record document in DB
-        await db.documents.insert_one({
+    # Record document in DB (re-indexing updates the existing record)
+    db = storage.get_db()
+    await db.documents.update_one(
+        {"name": doc_name},
+        {"$set": {
+            "id": document_id(doc_name),
             "name": doc_name,
             "filename": os.path.basename(file_path),
             "status": "INDEXED",
             "chunks_count": chunks_count,
             "indexed_at": datetime.utcnow()
-        })
+        }},
+        upsert=True
+    )
+    # Invalidates reused answers and cached retrieval built on the previous corpus
+    await bump_corpus_version()
+    return chunks_count
+
+async def mark_projects_outdated(doc_names: List[str]):
+    # Mark ALL_DOCS projects and projects scoped to an indexed document as OUTDATED
+    db = storage.get_db()
+    await db.projects.update_many(
+        {"document_scope": {"$in": ["ALL_DOCS", *doc_names, *[document_id(n) for n in doc_names]]}, "status": ProjectStatus.COMPLETED},
+        {"$set": {"status": ProjectStatus.OUTDATED, "updated_at": datetime.utcnow()}}
+    )
+
+async def index_document_async_task(job_id: str, file_path: str, doc_name: str):
+    try:
+        await job_manager.update_job(job_id, status=JobStatus.RUNNING, message="Chunking and indexing...")
+
+        async def report_pages(pages_done: int, total_pages: int):
+            await job_manager.update_job(job_id, progress=pages_done / total_pages, message=f"Indexed {pages_done}/{total_pages} pages...")
+
+        await index_file(file_path, doc_name, progress_callback=report_pages)
+        await mark_projects_outdated([doc_name])
 
-        await db.projects.update_many(
-            {"document_scope": "ALL_DOCS", "status": ProjectStatus.COMPLETED},
-            {"$set": {"status": ProjectStatus.OUTDATED, "updated_at": datetime.utcnow()}}
-        )
-        
         await job_manager.update_job(job_id, status=JobStatus.COMPLETED, message="Indexing complete. Projects synced.")
     except Exception as e:
         await job_manager.update_job(job_id, status=JobStatus.FAILED, error=str(e))
 
-async def create_project_async_task(job_id: str, name: str, questionnaire_path: str, scope: str, project_id: Optional[str] = None, force_regenerate: bool = False):
+async def index_documents_bulk_task(job_id: str, files: List[Tuple[str, str]], concurrency: int = INDEX_BULK_CONCURRENCY):
+    """Index many (file_path, doc_name) pairs under one parent job."""
+    try:
+        await job_manager.update_job(job_id, status=JobStatus.RUNNING, message=f"Indexing {len(files)} files...")
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        file_progress = {file_path: 0.0 for file_path, _ in files}
+        indexed, failed = {}, {}
+
+        async def report():
+            progress = sum(file_progress.values()) / len(files)
+            done = len(indexed) + len(failed)
+            await job_manager.update_job(job_id, progress=progress, message=f"Indexed {done}/{len(files)} files...")
+
+        async def index_one(file_path: str, doc_name: str):
+            async with semaphore:
+                async def report_pages(pages_done: int, total_pages: int):
+                    file_progress[file_path] = pages_done / total_pages
+                    await report()
+
+                try:
+                    indexed[doc_name] = await index_file(file_path, doc_name, progress_callback=report_pages)
+                except Exception as e:
+                    print(f"Error indexing {file_path}: {e}")
+                    failed[doc_name] = format_api_error(e)
+                file_progress[file_path] = 1.0
+                await report()
+
+        await asyncio.gather(*[index_one(file_path, doc_name) for file_path, doc_name in files])
+
+        # Projects are synced once for the whole batch rather than once per file
+        if indexed:
+            await mark_projects_outdated(list(indexed))
+
+        result = {"indexed": indexed, "failed": failed}
+        if not indexed:
+            await job_manager.update_job(job_id, status=JobStatus.FAILED, error=f"All {len(files)} files failed to index.", result=result)
+        else:
+            message = f"Indexed {len(indexed)}/{len(files)} files. Projects synced."
+            if failed:
+                message += f" {len(failed)} failed."
+            await job_manager.update_job(job_id, status=JobStatus.COMPLETED, progress=1.0, message=message, result=result)
+    except Exception as e:
+        await job_manager.update_job(job_id, status=JobStatus.FAILED, error=str(e))
+
+async def create_project_async_task(job_id: str, name: str, questionnaire_path: str, scope: Union[str, List[str]], project_id: Optional[str] = None, force_regenerate: bool = False, refresh: bool = False):
     try:
         db = storage.get_db()
+
+        # A requeued job resumes the project its earlier attempt already created
+        recovered = False
+        if not project_id:
+            job = await job_manager.get_job(job_id)
+            project_id = ((job or {}).get("result") or {}).get("project_id")
+            recovered = project_id is not None
         
         # 1. Create or Get Project Entry
         if not project_id:
@@ -56,16 +142,22 @@ async def create_project_async_task(job_id: str, name: str, questionnaire_path:
             
             # 2. Parse Questions (Only if new project)
             await job_manager.update_job(job_id, status=JobStatus.RUNNING, message="Parsing questionnaire...")
-            questions = questionnaire_parser.parse(questionnaire_path, project_id)
+            questions = await questionnaire_parser.parse(questionnaire_path, project_id)
+            if questions:
+                await db.questions.insert_many([q.dict() for q in questions])
+        elif recovered and not await db.questions.count_documents({"project_id": project_id}):
+            # The previous attempt stopped before the questions were saved
+            await job_manager.update_job(job_id, status=JobStatus.RUNNING, message="Parsing questionnaire...")
+            questions = await questionnaire_parser.parse(questionnaire_path, project_id)
             if questions:
                 await db.questions.insert_many([q.dict() for q in questions])
         else:
             await job_manager.update_job(job_id, status=JobStatus.RUNNING, message="Resuming project generation...", result={"project_id": project_id})
-            if force_regenerate:
-                await db.projects.update_one({"id": project_id}, {"$set": {"status": ProjectStatus.READY}})
+            if force_regenerate or refresh:
+                await db.projects.update_one({"id": project_id}, {"$set": {"status": ProjectStatus.PROCESSING, "updated_at": datetime.utcnow()}})
 
         # 3. Trigger Generation (Internal helper)
-        await generate_answers_for_project(job_id, project_id, force_regenerate)
+        await generate_answers_for_project(job_id, project_id, force_regenerate, refresh=refresh)
         
     except Exception as e:
         await job_manager.update_job(job_id, status=JobStatus.FAILED, error=str(e))
@@ -74,7 +166,35 @@ async def create_project_async_task(job_id: str, name: str, questionnaire_path:
             db = storage.get_db()
             await db.projects.update_one({"id": project_id}, {"$set": {"status": ProjectStatus.FAILED, "updated_at": datetime.utcnow()}})
 
-async def generate_answers_for_project(job_id: str, project_id: str, force_regenerate: bool = False):
+def group_questions(questions: List[dict], retrieved: dict, max_size: int) -> List[List[dict]]:
+    """Group questions for batched LLM calls: same section, preferring overlapping retrieval results."""
+    if max_size <= 1:
+        return [[q] for q in questions]
+
+    groups = []  # (section, chunk ids, questions)
+    for question in questions:
+        section = question.get("section")
+        chunk_ids = {doc.metadata.get("_id") for doc, _ in retrieved.get(question["id"], [])} - {None}
+        candidates = [g for g in groups if g[0] == section and len(g[2]) < max_size]
+        if not candidates:
+            groups.append((section, set(chunk_ids), [question]))
+            continue
+        # Most shared context first; otherwise any open group of the same section
+        best = max(candidates, key=lambda g: len(g[1] & chunk_ids))
+        best[1].update(chunk_ids)
+        best[2].append(question)
+    return [g[2] for g in groups]
+
+def cited_chunk_ids(answer: dict) -> set:
+    return {citation.get("chunk_id") for citation in answer.get("citations", [])}
+
+async def generate_answers_for_project(job_id: str, project_id: str, force_regenerate: bool = False, refresh: bool = False, concurrency: int = GENERATION_CONCURRENCY):
+    """Answer a project's questions.
+
+    By default only unanswered questions are generated. force_regenerate replaces every
+    AI answer; refresh re-runs retrieval and regenerates only the AI answers whose
+    top-k chunks no longer match the chunks they cite.
+    """
     db = storage.get_db()
     
     # Load Questions
@@ -84,47 +204,182 @@ async def generate_answers_for_project(job_id: str, project_id: str, force_regen
     project = await db.projects.find_one({"id": project_id})
     scope = project.get("document_scope", "ALL_DOCS")
 
-    # If force, clear existing answers first
+    # If force, clear existing answers first (confirmed and manually edited ones stay)
     if force_regenerate:
         await job_manager.update_job(job_id, message="Clearing previous answers for fresh regeneration...")
-        await db.answers.delete_many({"project_id": project_id})
-        # Reset questions status if needed, though generate_answer will overwrite anyway
-        await db.questions.update_many({"project_id": project_id}, {"$set": {"status": "PENDING"}})
-
-    # Trigger Answer Generation
-    for i, question in enumerate(questions):
-        # Check if answer already exists (if not forced)
-        if not force_regenerate:
-            existing_answer = await db.answers.find_one({"question_id": question["id"]})
-            if existing_answer:
-                continue
+        await db.answers.delete_many({"project_id": project_id, "status": {"$nin": PROTECTED_ANSWER_STATUSES}})
+
+    # Check which answers already exist, in one query
+    existing = {
+        answer["question_id"]: answer
+        for answer in await db.answers.find({"project_id": project_id}, {"_id": 0, "question_id": 1, "status": 1, "citations": 1}).to_list(None)
+    }
+    pending = [q for q in questions if q["id"] not in existing]
+    if force_regenerate:
+        await db.questions.update_many({"project_id": project_id, "id": {"$in": [q["id"] for q in pending]}}, {"$set": {"status": "PENDING"}})
+
+    total = len(questions)
+    progress = {"done": total - len(pending), "failed": 0, "reused": 0, "kept": 0, "regenerated": 0}
+    corpus_version = await get_corpus_version()
+
+    # Retrieve context for every pending question in a few batched round trips
+    retrieved = {}
+
+    async def retrieve(batch):
+        try:
+            contexts = await generation_service.retrieve_batch([q["text"] for q in batch], scope)
+            retrieved.update({q["id"]: docs for q, docs in zip(batch, contexts)})
+        except Exception as e:
+            # Fall back to per-question retrieval inside generate_answer
+            print(f"Batch retrieval failed for project {project_id}: {e}")
+
+    # Incremental refresh: an AI answer is stale only if its supporting context changed
+    if refresh:
+        candidates = [q for q in questions if q["id"] in existing and existing[q["id"]].get("status") not in PROTECTED_ANSWER_STATUSES]
+        progress["kept"] = len(existing) - len(candidates)
+        if candidates:
+            await job_manager.update_job(job_id, message=f"Checking context of {len(candidates)} answers...")
+            await retrieve(candidates)
+        stale = []
+        for question in candidates:
+            docs = retrieved.get(question["id"])
+            cited = cited_chunk_ids(existing[question["id"]])
+            # Answers without chunk IDs (or failed retrieval) can't be compared, so they are regenerated
+            if docs is not None and None not in cited and cited == {doc.metadata.get("_id") for doc, _ in docs}:
+                progress["kept"] += 1
+            else:
+                stale.append(question)
+        progress["regenerated"] = len(stale)
+        progress["done"] -= len(stale)
+        pending = stale + pending
+
+    # Copy answers of near-identical questions already answered against this scope and corpus
+    reused = {}
+    if pending:
+        try:
+            reused = await answer_reuse_service.find_batch(project_id, pending, scope)
+        except Exception as e:
+            print(f"Answer reuse lookup failed for project {project_id}: {e}")
+    if reused:
+        await db.answers.bulk_write([
+            ReplaceOne({"project_id": project_id, "question_id": answer.question_id}, answer.dict(), upsert=True)
+            for answer in reused.values()
+        ])
+        await db.questions.update_many({"id": {"$in": list(reused)}}, {"$set": {"status": "AI_GENERATED"}})
+        progress["done"] += len(reused)
+        progress["reused"] = len(reused)
+        pending = [q for q in pending if q["id"] not in reused]
+
+    unretrieved = [q for q in pending if q["id"] not in retrieved]
+    if unretrieved:
+        await job_manager.update_job(job_id, message=f"Retrieving context for {len(unretrieved)} questions...")
+        await retrieve(unretrieved)
 
-        await job_manager.update_job(job_id, progress=0.1 + (0.9 * (i/len(questions))), message=f"Generating answer {i+1}/{len(questions)}...")
+    async def save_answer(question, answer):
+        # Replaces the stale answer when refreshing
+        await db.answers.replace_one({"project_id": project_id, "question_id": question["id"]}, answer.dict(), upsert=True)
+        # Update question status to reflect it's been processed
+        await db.questions.update_one({"id": question["id"]}, {"$set": {"status": "AI_GENERATED"}})
+        await answer_reuse_service.remember(answer, question["text"], scope, corpus_version)
+
+    async def generate_one(question):
         try:
-            answer = await generation_service.generate_answer(project_id, question["id"], question["text"], collection_name=scope)
-            await db.answers.insert_one(answer.dict())
-            # Update question status to reflect it's been processed
-            await db.questions.update_one({"id": question["id"]}, {"$set": {"status": "AI_GENERATED"}})
+            answer = await generation_service.generate_answer(project_id, question["id"], question["text"], scope=scope, retrieved=retrieved.get(question["id"]))
+            await save_answer(question, answer)
         except Exception as e:
             print(f"Error generating answer for {question['id']}: {e}")
-            continue
-        
+            progress["failed"] += 1
+        # Answers finish out of order, so progress counts completions rather than positions
+        progress["done"] += 1
+        await job_manager.update_job(job_id, progress=0.1 + (0.9 * (progress["done"] / total)), message=f"Generated {progress['done']}/{total} answers...")
+
+    async def generate_group(group):
+        if len(group) == 1:
+            return await generate_one(group[0])
+        try:
+            answers = await generation_service.generate_answers_batch(project_id, group, scope=scope, retrieved=retrieved)
+        except Exception as e:
+            print(f"Batched generation failed for {len(group)} questions, answering individually: {e}")
+            answers = {}
+        for question in group:
+            if question["id"] not in answers:
+                # Skipped by the model (or the batch failed): answer on its own
+                await generate_one(question)
+                continue
+            try:
+                await save_answer(question, answers[question["id"]])
+            except Exception as e:
+                print(f"Error saving answer for {question['id']}: {e}")
+                progress["failed"] += 1
+            progress["done"] += 1
+        await job_manager.update_job(job_id, progress=0.1 + (0.9 * (progress["done"] / total)), message=f"Generated {progress['done']}/{total} answers...")
+
+    # Trigger Answer Generation with a bounded pool keeping `concurrency` question groups in flight
+    groups = group_questions(pending, retrieved, GENERATION_BATCH_SIZE)
+    queue = asyncio.Queue()
+    for group in groups:
+        queue.put_nowait(group)
+
+    cancelled = asyncio.Event()
+
+    async def worker():
+        while not cancelled.is_set():
+            # Take the group before awaiting anything, so no other worker can empty the queue in between
+            try:
+                group = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            # Cancellation takes effect between question groups; answers already saved are kept
+            if await job_manager.should_cancel(job_id):
+                cancelled.set()
+                return
+            await generate_group(group)
+
+    await job_manager.update_job(job_id, message=f"Generating {len(pending)} answers in {len(groups)} requests ({total - len(pending)} already answered)...")
+    await asyncio.gather(*[worker() for _ in range(max(1, min(concurrency, len(groups))))])
+
+    if cancelled.is_set():
+        # Stopped by a cancel request, not an error. A cancelled refresh still has stale answers, so the
+        # project stays OUTDATED (resuming refreshes it); otherwise it is resumable as CANCELLED
+        status = ProjectStatus.OUTDATED if refresh else ProjectStatus.CANCELLED
+        await db.projects.update_one({"id": project_id}, {"$set": {"status": status, "updated_at": datetime.utcnow()}})
+        await job_manager.update_job(job_id, status=JobStatus.CANCELLED, message=f"Cancelled after {progress['done']}/{total} answers.", result={"project_id": project_id})
+        return
+
     await db.projects.update_one({"id": project_id}, {"$set": {"status": ProjectStatus.COMPLETED, "updated_at": datetime.utcnow()}})
-    await job_manager.update_job(job_id, status=JobStatus.COMPLETED, message="Project processing complete.", result={"project_id": project_id})
+    message = "Project processing complete."
+    if refresh:
+        message = f"Project refreshed: {progress['kept']} answers kept, {progress['regenerated']} regenerated."
+    if progress["reused"]:
+        message += f" {progress['reused']} answers reused from similar questions."
+    if progress["failed"]:
+        message += f" {progress['failed']} answers failed."
+    result = {"project_id": project_id}
+    if refresh:
+        result.update({"kept": progress["kept"], "regenerated": progress["regenerated"]})
+    await job_manager.update_job(job_id, status=JobStatus.COMPLETED, message=message, result=result)
 
-async def generate_single_answer_task(job_id: str, project_id: str, question_id: str, question_text: str, scope: str = "ALL_DOCS"):
+async def save_single_answer(answer: Answer, question_text: str, scope: Union[str, List[str]], corpus_version: int):
+    db = storage.get_db()
+    await answer_reuse_service.remember(answer, question_text, scope, corpus_version)
+
+    # Upsert answer
+    await db.answers.update_one(
+        {"question_id": answer.question_id},
+        {"$set": answer.dict()},
+        upsert=True
+    )
+
+async def generate_single_answer_task(job_id: str, project_id: str, question_id: str, question_text: str, scope: Union[str, List[str]] = "ALL_DOCS"):
+    # A reviewer is waiting on this answer: its LLM calls go ahead of bulk generation
+    interactive_call.set(True)
     try:
         db = storage.get_db()
         await job_manager.update_job(job_id, status=JobStatus.RUNNING, message=f"Generating answer for question {question_id}...")
         
-        answer = await generation_service.generate_answer(project_id, question_id, question_text, collection_name=scope)
-        
-        # Upsert answer
-        await db.answers.update_one(
-            {"question_id": question_id},
-            {"$set": answer.dict()},
-            upsert=True
-        )
+        corpus_version = await get_corpus_version()
+        answer = await generation_service.generate_answer(project_id, question_id, question_text, scope=scope)
+        await save_single_answer(answer, question_text, scope, corpus_version)
         
         await job_manager.update_job(job_id, status=JobStatus.COMPLETED, message="Answer generated.", result={"question_id": question_id})
     except Exception as e:
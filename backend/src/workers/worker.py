@@ -0,0 +1,161 @@
+import os
+import time
+import signal
+import socket
+import asyncio
+import argparse
+import multiprocessing
+from typing import Dict, List, Optional
+
+from ..storage.db import storage
+from ..models.models import JobStatus
+from ..indexing.loader import shutdown_executor
+from .manager import job_manager, task_lane, JOB_LEASE_SECONDS, TASK_LANES
+from .registry import TASKS
+from .tasks import format_api_error
+
+# Bulk (generation + indexing) jobs run at once by one worker process; interactive jobs
+# have their own lane limit on top of this, so they never wait behind bulk work
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", 4))
+# Sleep between claim attempts while the queue is empty
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", 1.0))
+# Jobs run at once per priority lane, so slow indexing can't hold every slot
+WORKER_LANE_LIMITS = {
+    "interactive": int(os.getenv("WORKER_LIMIT_INTERACTIVE", 4)),
+    "generation": int(os.getenv("WORKER_LIMIT_GENERATION", 2)),
+    "indexing": int(os.getenv("WORKER_LIMIT_INDEXING", 1)),
+}
+
+class Worker:
+    """Claims queued jobs from Mongo and runs them, keeping their leases alive."""
+
+    def __init__(self, concurrency: int = WORKER_CONCURRENCY, worker_id: Optional[str] = None):
+        self.concurrency = max(1, concurrency)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.running: Dict[str, asyncio.Task] = {}
+        self.lanes: Dict[str, str] = {}
+        self.stopping = False
+
+    def stop(self):
+        # Stop claiming; jobs already running are allowed to finish
+        self.stopping = True
+
+    async def _heartbeat(self, job_id: str, work: asyncio.Task):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                owned = await job_manager.heartbeat(job_id, self.worker_id)
+            except Exception as e:
+                print(f"[{self.worker_id}] Heartbeat for {job_id} failed: {e}")
+                continue
+            if not owned:
+                # The lease expired and the job was requeued elsewhere: don't run it twice
+                print(f"[{self.worker_id}] Lost lease on {job_id}, cancelling")
+                work.cancel()
+                return
+
+    async def _execute(self, job: Dict):
+        job_id = job["job_id"]
+        task = TASKS.get(job["task"])
+        if task is None:
+            await job_manager.update_job(job_id, status=JobStatus.FAILED, error=f"Unknown task: {job['task']}")
+            self.running.pop(job_id, None)
+            self.lanes.pop(job_id, None)
+            return
+
+        print(f"[{self.worker_id}] Running {job['task']} ({job_id}, attempt {job.get('attempts', 1)})")
+        work = asyncio.create_task(task(job_id, **(job.get("args") or {})))
+        job_manager.bind(job_id, work)
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, work))
+        try:
+            await work
+            await job_manager.release(job_id, self.worker_id)
+        except asyncio.CancelledError:
+            job_manager.forget(job_id)
+        except Exception as e:
+            print(f"[{self.worker_id}] Job {job_id} failed: {e}")
+            await job_manager.update_job(job_id, status=JobStatus.FAILED, error=format_api_error(e))
+            await job_manager.release(job_id, self.worker_id)
+        finally:
+            heartbeat.cancel()
+            self.running.pop(job_id, None)
+            self.lanes.pop(job_id, None)
+
+    def _full_lane_tasks(self) -> List[str]:
+        lanes = list(self.lanes.values())
+        full = [lane for lane, limit in WORKER_LANE_LIMITS.items() if lanes.count(lane) >= limit]
+        if len(lanes) - lanes.count("interactive") >= self.concurrency:
+            # The process is full of bulk work; only the reserved interactive lane may still claim
+            full += [lane for lane in WORKER_LANE_LIMITS if lane != "interactive"]
+        return [task for task, lane in TASK_LANES.items() if lane in full]
+
+    async def run(self):
+        await job_manager.ensure_indexes()
+        print(f"[{self.worker_id}] Worker started (concurrency {self.concurrency}, lane limits {WORKER_LANE_LIMITS})")
+        last_requeue = 0.0
+        while not self.stopping:
+            # Any worker may return expired jobs to the queue; the update is idempotent
+            if time.monotonic() - last_requeue > JOB_LEASE_SECONDS / 2:
+                last_requeue = time.monotonic()
+                try:
+                    requeued = await job_manager.requeue_expired()
+                    if requeued:
+                        print(f"[{self.worker_id}] Requeued {requeued} jobs with expired leases")
+                except Exception as e:
+                    print(f"[{self.worker_id}] Requeue check failed: {e}")
+
+            exclude = self._full_lane_tasks()
+            if len(exclude) >= len(TASK_LANES):
+                await asyncio.wait(list(self.running.values()), timeout=WORKER_POLL_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            try:
+                job = await job_manager.claim(self.worker_id, exclude_tasks=exclude)
+            except Exception as e:
+                print(f"[{self.worker_id}] Claim failed: {e}")
+                job = None
+            if job is None:
+                await asyncio.sleep(WORKER_POLL_SECONDS)
+                continue
+            self.lanes[job["job_id"]] = task_lane(job["task"])
+            self.running[job["job_id"]] = asyncio.create_task(self._execute(job))
+
+        if self.running:
+            print(f"[{self.worker_id}] Waiting for {len(self.running)} running jobs...")
+            await asyncio.gather(*self.running.values(), return_exceptions=True)
+        print(f"[{self.worker_id}] Worker stopped")
+
+async def serve(concurrency: int):
+    await storage.connect()
+    worker = Worker(concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        await storage.disconnect()
+        shutdown_executor()
+
+def run_process(concurrency: int):
+    asyncio.run(serve(concurrency))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run queued jobs. Start more workers (on any machine) to scale out.")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="worker processes to start")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY, help="bulk jobs run at once per process (interactive jobs use their own lane limit)")
+    args = parser.parse_args()
+
+    # Split the PDF parser pool across worker processes instead of giving each one cpu_count parsers.
+    # Spawned children read PDF_WORKERS from the environment when they import the loader.
+    os.environ.setdefault("PDF_WORKERS", str(max(1, (os.cpu_count() or 1) // max(1, args.processes))))
+
+    if args.processes <= 1:
+        run_process(args.concurrency)
+    else:
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=run_process, args=(args.concurrency,)) for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
@@ -1,25 +1,46 @@
 import React, { useEffect, useState } from "react";
-import { Activity, X, AlertCircle } from "lucide-react";
+import { Activity, X, AlertCircle, Ban } from "lucide-react";
 import { projectApi } from "../services/api";
 
+// Running jobs of other types (indexing, single answers) can only be cancelled while queued
+const CANCELLABLE_TASKS = ["create_project", "generate_answers"];
+
+const canCancel = (job: any) =>
+  !job.cancel_requested &&
+  (job.status === "PENDING" || CANCELLABLE_TASKS.includes(job.task));
+
 const ActiveJobs: React.FC = () => {
   const [jobs, setJobs] = useState<any[]>([]);
 
-  const fetchActiveJobs = async () => {
+  useEffect(() => {
+    // Job updates are pushed by the server; finished jobs drop out of the list
+    const source = projectApi.streamJobs();
+    source.addEventListener("job", (event) => {
+      const update = JSON.parse((event as MessageEvent).data);
+      setJobs((current) => {
+        const existing = current.find((job) => job.job_id === update.job_id);
+        const merged = { ...existing, ...update };
+        const others = current.filter((job) => job.job_id !== update.job_id);
+        if (["COMPLETED", "FAILED", "CANCELLED"].includes(merged.status)) {
+          return others;
+        }
+        return existing
+          ? current.map((job) => (job.job_id === update.job_id ? merged : job))
+          : [merged, ...others];
+      });
+    });
+    source.onerror = () => console.error("Job stream disconnected, reconnecting...");
+    return () => source.close();
+  }, []);
+
+  const cancelJob = async (jobId: string) => {
     try {
-      const response = await projectApi.listActiveJobs();
-      setJobs(response.data);
+      await projectApi.cancelJob(jobId);
     } catch (err) {
-      console.error("Failed to fetch active jobs:", err);
+      console.error("Failed to cancel job", err);
     }
   };
 
-  useEffect(() => {
-    fetchActiveJobs();
-    const interval = setInterval(fetchActiveJobs, 3000);
-    return () => clearInterval(interval);
-  }, []);
-
   if (jobs.length === 0) return null;
 
   return (
@@ -46,9 +67,20 @@ const ActiveJobs: React.FC = () => {
                 <p className="text-xs font-bold text-slate-400 uppercase tracking-widest">
                   {job.type}
                 </p>
-                <span className="text-[10px] font-mono text-slate-600">
-                  {Math.round((job.progress || 0) * 100)}%
-                </span>
+                <div className="flex items-center gap-2">
+                  <span className="text-[10px] font-mono text-slate-600">
+                    {Math.round((job.progress || 0) * 100)}%
+                  </span>
+                  {canCancel(job) && (
+                    <button
+                      onClick={() => cancelJob(job.job_id)}
+                      title="Cancel"
+                      className="text-slate-600 hover:text-rose-400"
+                    >
+                      <Ban className="w-3 h-3" />
+                    </button>
+                  )}
+                </div>
               </div>
               <p className="text-sm text-slate-200 line-clamp-1">
                 {job.message}
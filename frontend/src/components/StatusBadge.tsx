@@ -1,5 +1,5 @@
 import React from "react";
-import { CheckCircle, Activity, AlertTriangle } from "lucide-react";
+import { CheckCircle, Activity, AlertTriangle, Ban } from "lucide-react";
 import type { ProjectStatus } from "../types/types";
 
 interface StatusBadgeProps {
@@ -12,6 +12,7 @@ const StatusBadge: React.FC<StatusBadgeProps> = ({ status }) => {
     PROCESSING: "bg-blue-500/10 text-blue-400 border-blue-500/20 animate-pulse",
     OUTDATED: "bg-amber-500/10 text-amber-400 border-amber-500/20",
     FAILED: "bg-rose-500/10 text-rose-400 border-rose-500/20",
+    CANCELLED: "bg-slate-500/10 text-slate-400 border-slate-500/20",
   };
 
   const icons: Record<string, React.ReactNode> = {
@@ -19,6 +20,7 @@ const StatusBadge: React.FC<StatusBadgeProps> = ({ status }) => {
     PROCESSING: <Activity className="w-3 h-3" />,
     OUTDATED: <AlertTriangle className="w-3 h-3" />,
     FAILED: <AlertTriangle className="w-3 h-3" />,
+    CANCELLED: <Ban className="w-3 h-3" />,
   };
 
   return (
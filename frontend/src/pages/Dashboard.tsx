@@ -209,6 +209,22 @@ const Dashboard: React.FC<DashboardProps> = ({ onSelectProject }) => {
                 </div>
               )}
 
+              {project.status === "CANCELLED" && (
+                <div className="mt-4 p-3 bg-slate-500/10 border border-slate-500/20 rounded-lg flex items-center justify-between gap-3 text-slate-400 text-sm">
+                  <p>Generation was cancelled. Answers generated so far are kept.</p>
+                  <button
+                    onClick={(e) => {
+                      e.stopPropagation();
+                      projectApi.resumeProjectGeneration(project.id, false);
+                      window.location.reload();
+                    }}
+                    className="flex-shrink-0 px-3 py-1.5 bg-slate-600 hover:bg-slate-500 text-white rounded-md text-xs font-bold transition-all"
+                  >
+                    Resume Generation
+                  </button>
+                </div>
+              )}
+
               {project.status === "OUTDATED" && (
                 <div className="mt-4 p-3 bg-amber-500/10 border border-amber-500/20 rounded-lg flex items-center justify-between gap-3 text-amber-400 text-sm">
                   <div className="flex items-center gap-3">
@@ -221,13 +237,14 @@ const Dashboard: React.FC<DashboardProps> = ({ onSelectProject }) => {
                   <button
                     onClick={(e) => {
                       e.stopPropagation();
-                      projectApi.resumeProjectGeneration(project.id, true);
+                      // Outdated projects refresh incrementally: only answers whose context changed are regenerated
+                      projectApi.resumeProjectGeneration(project.id, false);
                       // Optionally refresh projects or show a toast
                       window.location.reload();
                     }}
                     className="flex-shrink-0 px-3 py-1.5 bg-amber-600 hover:bg-amber-500 text-white rounded-md text-xs font-bold transition-all"
                   >
-                    Regenerate Now
+                    Refresh Answers
                   </button>
                 </div>
               )}
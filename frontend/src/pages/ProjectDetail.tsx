@@ -141,12 +141,17 @@ const ProjectDetail: React.FC<ProjectDetailProps> = ({ projectId, onBack }) => {
             </span>
             <span className="w-1 h-1 bg-slate-700 rounded-full"></span>
             <span className="text-sm text-slate-500 italic">
-              Scope: {project.document_scope}
+              Scope:{" "}
+              {Array.isArray(project.document_scope)
+                ? project.document_scope.join(", ")
+                : project.document_scope}
             </span>
           </div>
         </div>
         <div className="flex gap-3">
-          {(project.status === "FAILED" || project.status === "PROCESSING") && (
+          {(project.status === "FAILED" ||
+            project.status === "PROCESSING" ||
+            project.status === "CANCELLED") && (
             <button
               onClick={async () => {
                 await projectApi.resumeProjectGeneration(projectId, false);
@@ -243,6 +248,16 @@ const ProjectDetail: React.FC<ProjectDetailProps> = ({ projectId, onBack }) => {
                       >
                         {Math.round(currentA.confidence_score * 100)}%
                       </span>
+                      {currentA.reused_from && (
+                        <span
+                          className="text-[10px] font-bold uppercase tracking-tight text-sky-400 mt-1"
+                          title={`Copied from answer ${currentA.reused_from}`}
+                        >
+                          Reused (
+                          {Math.round((currentA.reuse_similarity || 0) * 100)}%
+                          match)
+                        </span>
+                      )}
                     </div>
                   )}
                 </div>
@@ -5,54 +5,54 @@ import {
   Clock,
   AlertTriangle,
   RefreshCw,
+  Ban,
 } from "lucide-react";
 import { projectApi } from "../services/api";
 
 interface Job {
   id: string;
   type: string;
-  status: "COMPLETED" | "RUNNING" | "PENDING" | "FAILED";
+  status: "COMPLETED" | "RUNNING" | "PENDING" | "FAILED" | "CANCELLED";
   message: string;
   time: string;
 }
 
+const toJob = (data: any): Job => ({
+  id: data.job_id,
+  type: data.type,
+  status: data.status,
+  message: data.error || data.message || "",
+  time: data.updated_at ? new Date(data.updated_at + "Z").toLocaleTimeString() : "",
+});
+
 const RequestStatus: React.FC = () => {
-  const [jobs, setJobs] = useState<Job[]>([]);
+  const [updates, setUpdates] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
+  const [connection, setConnection] = useState(0);
+  const jobs = updates.map(toJob);
 
-  const fetchJobs = async () => {
+  useEffect(() => {
+    // Active jobs arrive first, then every change is pushed as it happens
     setLoading(true);
-    try {
-      // Since we don't have a listJobs endpoint, we'll use a placeholder for now
-      setJobs([
-        {
-          id: "job_001",
-          type: "PROJECT_CREATION",
-          status: "COMPLETED",
-          message: "Project created subset successfully",
-          time: "2 mins ago",
-        },
-        {
-          id: "job_002",
-          type: "INDEXING",
-          status: "RUNNING",
-          message: "Injesting document: financial_report.pdf",
-          time: "Just now",
-        },
-      ]);
-      await projectApi.getHealth();
-    } catch (error) {
-      console.error("Failed to fetch jobs:", error);
-    } finally {
-      setLoading(false);
-    }
-  };
+    const source = projectApi.streamJobs();
+    source.onopen = () => setLoading(false);
+    source.addEventListener("job", (event) => {
+      const update = JSON.parse((event as MessageEvent).data);
+      setUpdates((current) => {
+        const exists = current.some((job) => job.job_id === update.job_id);
+        return exists
+          ? current.map((job) => (job.job_id === update.job_id ? { ...job, ...update } : job))
+          : [update, ...current];
+      });
+    });
+    source.onerror = () => setLoading(true);
+    return () => source.close();
+  }, [connection]);
 
-  useEffect(() => {
-    fetchJobs();
-    const interval = setInterval(fetchJobs, 10000); // Polling every 10s
-    return () => clearInterval(interval);
-  }, []);
+  const fetchJobs = () => {
+    setUpdates([]);
+    setConnection((count) => count + 1);
+  };
 
   return (
     <div className="space-y-8 animate-in fade-in duration-500">
@@ -127,6 +127,7 @@ const JobStatusBadge = ({ status }: { status: Job["status"] }) => {
     RUNNING: "bg-blue-500/10 text-blue-400 border-blue-500/20 animate-pulse",
     PENDING: "bg-amber-500/10 text-amber-400 border-amber-500/20",
     FAILED: "bg-rose-500/10 text-rose-400 border-rose-500/20",
+    CANCELLED: "bg-slate-500/10 text-slate-400 border-slate-500/20",
   };
 
   const icons: Record<Job["status"], React.ReactNode> = {
@@ -134,6 +135,7 @@ const JobStatusBadge = ({ status }: { status: Job["status"] }) => {
     RUNNING: <Activity className="w-3 h-3" />,
     PENDING: <Clock className="w-3 h-3" />,
     FAILED: <AlertTriangle className="w-3 h-3" />,
+    CANCELLED: <Ban className="w-3 h-3" />,
   };
 
   return (
@@ -9,7 +9,7 @@ export const projectApi = {
   createProject: (data: {
     name: string;
     questionnaire_path: string;
-    scope: string;
+    scope: string | string[];
   }) => api.post("/create-project-async", data),
 
   getProjectInfo: (projectId: string) =>
@@ -37,6 +37,12 @@ export const projectApi = {
       question_id: questionId,
     }),
 
+  // Server-sent events: "job", "citations", "token"..., then "done" (final answer) or "error"
+  streamSingleAnswer: (projectId: string, questionId: string) =>
+    new EventSource(
+      `${api.defaults.baseURL}/generate-single-answer/stream?project_id=${encodeURIComponent(projectId)}&question_id=${encodeURIComponent(questionId)}`,
+    ),
+
   generateAllAnswers: (projectId: string) =>
     api.post("/generate-all-answers", { project_id: projectId }),
 
@@ -57,6 +63,16 @@ export const projectApi = {
 
   listActiveJobs: () => api.get("/jobs/active"),
 
+  // Queued jobs stop at once; running jobs stop at their next checkpoint
+  cancelJob: (jobId: string) => api.post(`/jobs/${jobId}/cancel`),
+
+  // Server-sent "job" events: every active job (or one job, closed once it finishes).
+  // EventSource reconnects on its own and resumes from the last event it saw.
+  streamJobs: (jobId?: string) =>
+    new EventSource(
+      `${api.defaults.baseURL}/jobs/stream${jobId ? `?job_id=${encodeURIComponent(jobId)}` : ""}`,
+    ),
+
   evaluateProject: (projectId: string, groundTruth: Record<string, string>) =>
     api.post(`/evaluate-project/${projectId}`, groundTruth),
 
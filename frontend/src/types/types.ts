@@ -1,4 +1,4 @@
-export type ProjectStatus = "COMPLETED" | "PROCESSING" | "OUTDATED" | "FAILED";
+export type ProjectStatus = "COMPLETED" | "PROCESSING" | "OUTDATED" | "FAILED" | "CANCELLED";
 
 export interface Project {
   id: string;
@@ -7,7 +7,7 @@ export interface Project {
   updated_at: string;
   question_count?: number;
   answered_count?: number;
-  document_scope: string;
+  document_scope: string | string[];
   average_evaluation_score?: number;
   last_evaluated_at?: string;
 }
@@ -36,6 +36,8 @@ export interface Answer {
   citations: Citation[];
   evaluation_score?: number;
   ground_truth?: string;
+  reused_from?: string;
+  reuse_similarity?: number;
 }
 
 export interface Document {
@@ -1,10 +1,23 @@
 import requests
-import time
+import json
 import os
 
 BASE_URL = "http://localhost:8000"
 DATA_DIR = "/media/arnob/New Volume/Dev/DDL/data"
 
+def wait_for_job(job_id, label):
+    """Follow a job over the server-sent event stream until it finishes; returns its final state."""
+    with requests.get(f"{BASE_URL}/jobs/stream", params={"job_id": job_id}, stream=True) as resp:
+        for line in resp.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data: "):
+                continue
+            status = json.loads(line[len("data: "):])
+            print(f"⏳ {label} Status: {status['status']} - {status.get('message', '')} ({(status.get('progress') or 0)*100:.0f}%)")
+            if status['status'] in ('COMPLETED', 'FAILED'):
+                return status
+    # Stream closed early: fall back to a single status read
+    return requests.get(f"{BASE_URL}/get-request-status/{job_id}").json()
+
 def run_smoke_test():
     print("🚀 Starting Questionnaire Agent Smoke Test...")
     
@@ -23,14 +36,10 @@ def run_smoke_test():
     job_id = resp.json().get("job_id")
     print(f"📤 Indexing Job Started: {job_id}")
 
-    # Poll status
-    while True:
-        status = requests.get(f"{BASE_URL}/get-request-status/{job_id}").json()
-        print(f"⏳ Indexing Status: {status['status']} - {status.get('message', '')}")
-        if status['status'] == 'COMPLETED': break
-        if status['status'] == 'FAILED': 
-            print("❌ Indexing Failed"); return
-        time.sleep(2)
+    # Follow status
+    status = wait_for_job(job_id, "Indexing")
+    if status['status'] != 'COMPLETED':
+        print("❌ Indexing Failed"); return
 
     # 3. Create Project & Generate Answers
     q_doc = os.path.join(DATA_DIR, "ILPA_Due_Diligence_Questionnaire_v1.2.pdf")
@@ -39,17 +48,11 @@ def run_smoke_test():
     proj_job_id = resp.json().get("job_id")
     print(f"🏗️ Project Creation Job Started: {proj_job_id}")
 
-    # Poll status
-    project_id = None
-    while True:
-        status = requests.get(f"{BASE_URL}/get-request-status/{proj_job_id}").json()
-        print(f"⏳ Project Status: {status['status']} - {status.get('message', '')} ({status.get('progress', 0)*100:.0f}%)")
-        if status['status'] == 'COMPLETED':
-            project_id = status['result']['project_id']
-            break
-        if status['status'] == 'FAILED': 
-            print("❌ Project Creation Failed"); return
-        time.sleep(3)
+    # Follow status
+    status = wait_for_job(proj_job_id, "Project")
+    if status['status'] != 'COMPLETED':
+        print("❌ Project Creation Failed"); return
+    project_id = status['result']['project_id']
 
     # 4. Verify Project Content
     resp = requests.get(f"{BASE_URL}/get-project-info/{project_id}")
@@ -59,9 +62,9 @@ def run_smoke_test():
     # 5. Test Transition to OUTDATED
     print("🔄 Testing OUTDATED transition...")
     new_doc = os.path.join(DATA_DIR, "20260110_MiniMax_Accountants_Report.pdf")
-    requests.post(f"{BASE_URL}/index-document-async", json={"file_path": new_doc, "doc_name": "New Doc"})
-    # Wait a bit for background update
-    time.sleep(2)
+    resp = requests.post(f"{BASE_URL}/index-document-async", json={"file_path": new_doc, "doc_name": "New Doc"})
+    # Projects are marked OUTDATED when the indexing job completes
+    wait_for_job(resp.json().get("job_id"), "Indexing")
     status = requests.get(f"{BASE_URL}/get-project-status/{project_id}").json()
     print(f"🚩 New Project Status: {status['status']}")
     